@@ -9,8 +9,26 @@ import plotly.graph_objects as go
 from dash.dependencies import Input, Output, State
 import dash_bootstrap_components as dbc
 import numpy as np
+import openpyxl
+import pyarrow as pa
+import flask
 import base64
+import cProfile
+import functools
+import hashlib
 import io
+import json
+import pstats
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 # Sử dụng chủ đề Bootstrap hiện đại
 external_stylesheets = [
@@ -23,6 +41,564 @@ app = dash.Dash(__name__, external_stylesheets=external_stylesheets, suppress_ca
 app.title = 'Project Management Dashboard'
 server = app.server
 
+# Kho DataFrame phía máy chủ: dcc.Store chỉ giữ mã dataset thay vì toàn bộ JSON.
+# Mỗi dataset là một dict {tên bảng: DataFrame hoặc chỉ mục ProjectID}; giữ tối đa
+# DATASET_REGISTRY_SIZE dataset gần nhất trong bộ nhớ (LRU). Các DataFrame được
+# chia sẻ giữa các callback nên không được sửa trực tiếp sau khi đăng ký.
+# Mỗi dataset còn được ghi ra DATASET_DIR ở định dạng Arrow IPC để các worker
+# gunicorn khác (hoặc sau khi bị đẩy khỏi bộ nhớ) đọc lại mà không cần phân tích.
+# Thư mục này đồng thời là bộ đệm dữ liệu tải lên theo nội dung (xem ingest_key):
+# giới hạn theo số dataset và tổng dung lượng, dataset ít được dùng gần đây nhất
+# (mtime, được cập nhật mỗi lần đọc) bị xóa trước.
+DATASET_REGISTRY_SIZE = int(os.environ.get('DASHBOARD_DATASET_REGISTRY_SIZE', 32))
+DATASET_DIR = os.environ.get('DASHBOARD_DATASET_DIR', os.path.join(tempfile.gettempdir(), 'dashboard-datasets'))
+DATASET_DIR_LIMIT = int(os.environ.get('DASHBOARD_DATASET_DIR_LIMIT', 128))
+DATASET_DIR_MAX_BYTES = int(os.environ.get('DASHBOARD_DATASET_DIR_MAX_MB', 1024)) * 1024 * 1024
+_dataset_registry = OrderedDict()
+_dataset_registry_lock = threading.Lock()
+
+
+# Mã hóa DataFrame thành Arrow IPC: giữ nguyên kiểu datetime, category và số,
+# đọc lại không cần phân tích chuỗi như JSON
+def encode_frame(df):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+# Cột object lẫn số và chuỗi (thường gặp ở tệp xlsx sửa tay, ví dụ Dependencies có
+# 1011 ở dòng này và "1011, 1012" ở dòng khác) không mã hóa được sang Arrow: các giá
+# trị khác rỗng của cột đó được chuyển thành chuỗi trước khi lưu
+def normalize_mixed_columns(df):
+    normalized = None
+    for position, (_, series) in enumerate(df.items()):
+        is_category = isinstance(series.dtype, pd.CategoricalDtype)
+        if not is_category and series.dtype != object:
+            continue
+        values = series.cat.categories if is_category else series
+        if pd.api.types.infer_dtype(values, skipna=True) not in ('mixed', 'mixed-integer'):
+            continue
+        series = series.astype(object)
+        series = series.where(series.isna(), series.astype(str))
+        if normalized is None:
+            normalized = df.copy()
+        normalized.isetitem(position, series.astype('category') if is_category else series)
+    return df if normalized is None else normalized
+
+
+def decode_frame(data):
+    return pa.ipc.open_stream(data).read_all().to_pandas()
+
+
+# Chỉ mục ProjectID -> (start, end) được lưu dưới dạng bảng ba cột
+def encode_project_index(index):
+    keys = list(index)
+    return encode_frame(pd.DataFrame({
+        'ProjectID': keys,
+        'start': [index[key][0] for key in keys],
+        'end': [index[key][1] for key in keys],
+    }))
+
+
+def decode_project_index(data):
+    df = decode_frame(data)
+    return dict(zip(df['ProjectID'].tolist(), zip(df['start'].tolist(), df['end'].tolist())))
+
+
+def _dataset_path(dataset_id):
+    if not re.fullmatch(r'[0-9a-f]{32}', dataset_id):
+        return None
+    return os.path.join(DATASET_DIR, dataset_id)
+
+
+def _write_dataset(dataset_id, frames):
+    path = _dataset_path(dataset_id)
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    try:
+        os.makedirs(tmp_path, exist_ok=True)
+        for name, value in frames.items():
+            if isinstance(value, pd.DataFrame):
+                data, suffix = encode_frame(value), '.arrow'
+            else:
+                data, suffix = encode_project_index(value), '.index.arrow'
+            with open(os.path.join(tmp_path, name + suffix), 'wb') as f:
+                f.write(data)
+        os.rename(tmp_path, path)
+    except (OSError, pa.ArrowException) as e:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        # Worker khác vừa ghi cùng dataset (mã theo nội dung) thì không phải lỗi
+        if isinstance(e, OSError) and os.path.isdir(path):
+            return
+        # Dataset chỉ nằm trong bộ nhớ worker này sẽ mất khi bị đẩy khỏi LRU hoặc
+        # khi yêu cầu sau tới worker khác: báo lỗi để lần tải dữ liệu thất bại rõ ràng
+        print(f"Không thể ghi dataset {dataset_id}: {e}")
+        raise
+    _prune_dataset_dir()
+
+
+def _read_dataset(dataset_id):
+    path = _dataset_path(dataset_id)
+    if path is None or not os.path.isdir(path):
+        return None
+    frames = {}
+    try:
+        for filename in os.listdir(path):
+            with open(os.path.join(path, filename), 'rb') as f:
+                data = f.read()
+            if filename.endswith('.index.arrow'):
+                frames[filename[:-len('.index.arrow')]] = decode_project_index(data)
+            elif filename.endswith('.arrow'):
+                frames[filename[:-len('.arrow')]] = decode_frame(data)
+        os.utime(path)
+    except (OSError, pa.ArrowException) as e:
+        print(f"Không thể đọc dataset {dataset_id}: {e}")
+        return None
+    return frames
+
+
+def _dataset_size(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+def _prune_dataset_dir():
+    try:
+        entries = [os.path.join(DATASET_DIR, name) for name in os.listdir(DATASET_DIR) if '.tmp-' not in name]
+        entries.sort(key=os.path.getmtime, reverse=True)
+        sizes = [_dataset_size(path) for path in entries]
+    except OSError:
+        return
+    # Giữ các dataset mới dùng nhất cho tới khi vượt giới hạn số lượng hoặc dung lượng
+    total = 0
+    for number, (path, size) in enumerate(zip(entries, sizes)):
+        total += size
+        if number >= DATASET_DIR_LIMIT or (number > 0 and total > DATASET_DIR_MAX_BYTES):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+# Dataset đã có trong bộ nhớ hoặc trên đĩa (đánh dấu vừa được dùng)
+def has_dataset(dataset_id):
+    with _dataset_registry_lock:
+        if dataset_id in _dataset_registry:
+            _dataset_registry.move_to_end(dataset_id)
+            return True
+    path = _dataset_path(dataset_id)
+    if path is None or not os.path.isdir(path):
+        return False
+    try:
+        os.utime(path)
+    except OSError:
+        return False
+    return True
+
+
+def _remember_dataset(dataset_id, frames):
+    with _dataset_registry_lock:
+        _dataset_registry[dataset_id] = frames
+        _dataset_registry.move_to_end(dataset_id)
+        while len(_dataset_registry) > DATASET_REGISTRY_SIZE:
+            _dataset_registry.popitem(last=False)
+
+
+def register_dataset(frames, dataset_id=None):
+    dataset_id = dataset_id or uuid.uuid4().hex
+    frames = {name: normalize_mixed_columns(value) if isinstance(value, pd.DataFrame) else value
+              for name, value in frames.items()}
+    _write_dataset(dataset_id, frames)
+    _remember_dataset(dataset_id, frames)
+    return dataset_id
+
+
+def get_dataset(dataset_id):
+    if not dataset_id:
+        return None
+    with _dataset_registry_lock:
+        frames = _dataset_registry.get(dataset_id)
+        if frames is not None:
+            _dataset_registry.move_to_end(dataset_id)
+            return frames
+    # Dataset do worker khác đăng ký hoặc đã bị đẩy khỏi bộ nhớ
+    start = time.perf_counter()
+    frames = _read_dataset(dataset_id)
+    record_deserialize_time(time.perf_counter() - start)
+    if frames is None:
+        return None
+    _remember_dataset(dataset_id, frames)
+    return frames
+
+
+def get_frame(dataset_id, name):
+    frames = get_dataset(dataset_id)
+    if frames is None:
+        return None
+    return frames.get(name)
+
+
+# Bộ đệm LRU dùng chung (có giới hạn số phần tử và bộ đếm hit/miss)
+class LRUCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+# Kho SQLite tùy chọn (DASHBOARD_STORAGE=sqlite): các bảng đã xử lý mà callback theo
+# dự án và KPI cần (SQLITE_TABLES) được ghi thêm vào một tệp SQLite có chỉ mục trên
+# ProjectID, (RiskStatus, RiskScore) và ProjectStatus. Các callback đó truy vấn đúng
+# các dòng/cột cần thiết thay vì nạp cả dataset vào bộ nhớ của worker; Arrow trong
+# DATASET_DIR vẫn là nguồn cho các giai đoạn xử lý và là phương án dự phòng khi
+# bảng chưa có trong SQLite.
+STORAGE_BACKEND = os.environ.get('DASHBOARD_STORAGE', 'arrow')
+SQLITE_PATH = os.environ.get('DASHBOARD_SQLITE_PATH', os.path.join(tempfile.gettempdir(), 'dashboard-datasets.sqlite'))
+SQLITE_TABLES = {'projects_extended', 'milestones', 'resources', 'risks'}
+# Biểu thức chuẩn hóa trạng thái giống .str.strip().str.lower() (chỉ mục theo biểu thức)
+SQLITE_STATUS_EXPR = "lower(trim({}, ' ' || char(9, 10, 13)))"
+SQLITE_INDEXES = [
+    ['"ProjectID"'],
+    [SQLITE_STATUS_EXPR.format('"RiskStatus"'), '"RiskScore"'],
+    [SQLITE_STATUS_EXPR.format('"ProjectStatus"')],
+]
+
+
+class SQLiteStore:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._columns = LRUCache(256)
+        with self.connection() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS dataset_tables '
+                         '(dataset_id TEXT, name TEXT, dtypes TEXT, created REAL, PRIMARY KEY (dataset_id, name))')
+
+    # Mỗi luồng một kết nối (sqlite3 không cho dùng chung kết nối giữa các luồng)
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def table_name(dataset_id, name):
+        return f'"{dataset_id}_{name}"'
+
+    def has_tables(self, dataset_id):
+        count = self.connection().execute(
+            'SELECT COUNT(*) FROM dataset_tables WHERE dataset_id = ?', (dataset_id,)).fetchone()[0]
+        return count > 0
+
+    def write_dataset(self, dataset_id, frames):
+        tables = {name: df for name, df in frames.items() if name in SQLITE_TABLES and isinstance(df, pd.DataFrame)}
+        if not tables:
+            return
+        with self._write_lock, self.connection() as conn:
+            for name, df in tables.items():
+                table = self.table_name(dataset_id, name)
+                dtypes = {col: str(dtype) for col, dtype in df.dtypes.items()}
+                df = df.copy()
+                # Ngày lưu dạng chuỗi ISO (NaT -> NULL) để đọc lại chính xác tới nano giây
+                for col, dtype in dtypes.items():
+                    if dtype.startswith('datetime64'):
+                        df[col] = df[col].dt.strftime('%Y-%m-%dT%H:%M:%S.%f')
+                df.to_sql(f'{dataset_id}_{name}', conn, if_exists='replace', index=False)
+                for number, columns in enumerate(SQLITE_INDEXES):
+                    if all(col.split('"')[1] in dtypes for col in columns):
+                        conn.execute(f'CREATE INDEX IF NOT EXISTS "{dataset_id}_{name}_{number}" '
+                                     f'ON {table} ({", ".join(columns)})')
+                conn.execute('INSERT OR REPLACE INTO dataset_tables VALUES (?, ?, ?, ?)',
+                             (dataset_id, name, json.dumps(dtypes), time.time()))
+            self._prune(conn)
+
+    # Giữ tối đa DATASET_DIR_LIMIT dataset ghi gần nhất, giống giới hạn của DATASET_DIR
+    def _prune(self, conn):
+        stale = conn.execute(
+            'SELECT dataset_id, name FROM dataset_tables WHERE dataset_id NOT IN '
+            '(SELECT dataset_id FROM dataset_tables GROUP BY dataset_id ORDER BY MAX(created) DESC LIMIT ?)',
+            (DATASET_DIR_LIMIT,)).fetchall()
+        for dataset_id, name in stale:
+            conn.execute(f'DROP TABLE IF EXISTS {self.table_name(dataset_id, name)}')
+            conn.execute('DELETE FROM dataset_tables WHERE dataset_id = ? AND name = ?', (dataset_id, name))
+
+    def dtypes(self, dataset_id, name):
+        def load():
+            row = self.connection().execute(
+                'SELECT dtypes FROM dataset_tables WHERE dataset_id = ? AND name = ?', (dataset_id, name)).fetchone()
+            return json.loads(row[0]) if row else None
+        return self._columns.get_or_compute((dataset_id, name), load)
+
+    def query(self, dataset_id, name, where='', params=(), columns=None):
+        dtypes = self.dtypes(dataset_id, name)
+        if dtypes is None:
+            return None
+        columns = [col for col in (columns or dtypes) if col in dtypes]
+        select = ', '.join(f'"{col}"' for col in columns)
+        try:
+            df = pd.read_sql_query(f'SELECT {select} FROM {self.table_name(dataset_id, name)} {where} ORDER BY rowid',
+                                   self.connection(), params=params)
+        except (sqlite3.Error, pd.errors.DatabaseError) as e:
+            # Bảng đã bị xóa bởi worker khác: quay lại kho Arrow
+            print(f"Không thể truy vấn {name} của dataset {dataset_id}: {e}")
+            return None
+        # Khôi phục kiểu dữ liệu ban đầu (ngày tháng, bool, cột số toàn NULL); cột
+        # category được trả về dạng chuỗi như decategorize
+        for col in columns:
+            if dtypes[col].startswith('datetime64'):
+                df[col] = pd.to_datetime(df[col], format='%Y-%m-%dT%H:%M:%S.%f')
+            elif dtypes[col] not in ('object', 'category') and str(df[col].dtype) != dtypes[col]:
+                df[col] = df[col].astype(dtypes[col])
+        return df
+
+    def project_rows(self, dataset_id, name, project_id, columns=None):
+        return self.query(dataset_id, name, 'WHERE "ProjectID" = ?', (project_id,), columns)
+
+    # Số liệu KPI giống stage_projects_extended, tính bằng truy vấn có chỉ mục
+    def kpis(self, projects_id, risks_id):
+        if self.dtypes(projects_id, 'projects_extended') is None or self.dtypes(risks_id, 'risks') is None:
+            return None
+        projects = self.table_name(projects_id, 'projects_extended')
+        risks = self.table_name(risks_id, 'risks')
+        project_status = SQLITE_STATUS_EXPR.format('"ProjectStatus"')
+        risk_status = SQLITE_STATUS_EXPR.format('"RiskStatus"')
+        conn = self.connection()
+        try:
+            total = conn.execute(f'SELECT COUNT(*) FROM {projects}').fetchone()[0]
+            active = conn.execute(
+                f'SELECT COUNT(*) FROM {projects} WHERE {project_status} IN (\'in progress\', \'not started\') '
+                f'AND NOT "IsAtRisk"').fetchone()[0]
+            completed = conn.execute(
+                f'SELECT COUNT(*) FROM {projects} WHERE {project_status} = \'completed\'').fetchone()[0]
+            at_risk = conn.execute(
+                f'SELECT COUNT(DISTINCT "ProjectID") FROM {risks} WHERE {risk_status} = \'open\' AND "RiskScore" >= ?',
+                (HIGH_RISK_THRESHOLD,)).fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Không thể tính KPI từ SQLite: {e}")
+            return None
+        return [f"{total}", f"{active}", f"{completed}", f"{at_risk}"]
+
+
+sqlite_store = SQLiteStore(SQLITE_PATH) if STORAGE_BACKEND == 'sqlite' else None
+
+
+# Bộ đệm biểu đồ theo (tên callback, các giá trị đầu vào). Mã dataset trong kho là
+# duy nhất cho mỗi lần xử lý nên đóng vai trò dấu vân tay của dữ liệu.
+FIGURE_CACHE_SIZE = int(os.environ.get('DASHBOARD_FIGURE_CACHE_SIZE', 256))
+figure_cache = LRUCache(FIGURE_CACHE_SIZE)
+
+
+def _serialize_figures(value):
+    if isinstance(value, go.Figure):
+        return value.to_dict()
+    if isinstance(value, tuple):
+        return tuple(_serialize_figures(item) for item in value)
+    return value
+
+
+def cache_figure(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            key = (name, json.dumps(args, sort_keys=True, default=str))
+            return figure_cache.get_or_compute(key, lambda: _serialize_figures(func(*args)))
+        return wrapper
+    return decorator
+
+
+# Đo lường hiệu năng từng callback (bật bằng DASHBOARD_METRICS=1): thời gian chạy,
+# thời gian giải mã dữ liệu, số byte phản hồi và mẫu cProfile theo yêu cầu.
+# Số liệu được xuất ở định dạng văn bản Prometheus tại /metrics trên server Flask.
+METRICS_ENABLED = os.environ.get('DASHBOARD_METRICS', '0') == '1'
+METRICS_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROFILE_TOP_FUNCTIONS = 40
+_callback_metrics = {}
+_callback_metrics_lock = threading.Lock()
+_callback_timing = threading.local()
+_profile_requests = set()
+_profile_results = {}
+
+
+def _metrics_entry(name):
+    entry = _callback_metrics.get(name)
+    if entry is None:
+        entry = _callback_metrics[name] = {
+            'calls': 0, 'errors': 0, 'duration_sum': 0.0, 'deserialize_sum': 0.0,
+            'response_bytes': 0, 'buckets': [0] * len(METRICS_DURATION_BUCKETS),
+        }
+    return entry
+
+
+def record_deserialize_time(seconds):
+    if METRICS_ENABLED and hasattr(_callback_timing, 'deserialize'):
+        _callback_timing.deserialize += seconds
+
+
+def _run_profiled(name, func, args):
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args)
+    finally:
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+        with _callback_metrics_lock:
+            _profile_results[name] = output.getvalue()
+
+
+def instrument_callback(func):
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args):
+        with _callback_metrics_lock:
+            profile = name in _profile_requests
+            _profile_requests.discard(name)
+        if flask.has_request_context():
+            flask.g.metrics_callback = name
+        _callback_timing.deserialize = 0.0
+        start = time.perf_counter()
+        failed = False
+        try:
+            return _run_profiled(name, func, args) if profile else func(*args)
+        except dash.exceptions.PreventUpdate:
+            raise
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            deserialize = _callback_timing.deserialize
+            del _callback_timing.deserialize
+            with _callback_metrics_lock:
+                entry = _metrics_entry(name)
+                entry['calls'] += 1
+                entry['errors'] += failed
+                entry['duration_sum'] += elapsed
+                entry['deserialize_sum'] += deserialize
+                for i, bound in enumerate(METRICS_DURATION_BUCKETS):
+                    if elapsed <= bound:
+                        entry['buckets'][i] += 1
+    return wrapper
+
+
+# Thay cho @app.callback: đăng ký callback và bọc thêm lớp đo lường khi được bật
+def instrumented_callback(*args, **kwargs):
+    register = app.callback(*args, **kwargs)
+    if not METRICS_ENABLED:
+        return register
+
+    def decorator(func):
+        return register(instrument_callback(func))
+    return decorator
+
+
+# Mã của component đã kích hoạt callback (None khi hàm được gọi trực tiếp, ví dụ từ benchmark)
+def triggered_id():
+    try:
+        return dash.ctx.triggered_id
+    except dash.exceptions.MissingCallbackContextException:
+        return None
+
+
+# Các thuộc tính ("id.prop") đã kích hoạt callback (rỗng khi gọi trực tiếp)
+def triggered_props():
+    try:
+        return {t['prop_id'] for t in dash.ctx.triggered if t['prop_id'] != '.'}
+    except dash.exceptions.MissingCallbackContextException:
+        return set()
+
+
+def render_metrics():
+    lines = []
+
+    def metric(metric_name, metric_type, help_text, samples):
+        lines.append(f'# HELP {metric_name} {help_text}')
+        lines.append(f'# TYPE {metric_name} {metric_type}')
+        for labels, value in samples:
+            label_text = ','.join(f'{key}="{val}"' for key, val in labels.items())
+            lines.append(f'{metric_name}{{{label_text}}} {value}' if label_text else f'{metric_name} {value}')
+
+    with _callback_metrics_lock:
+        metrics = {name: dict(entry, buckets=list(entry['buckets'])) for name, entry in _callback_metrics.items()}
+    names = sorted(metrics)
+    metric('dashboard_callback_calls_total', 'counter', 'Số lần gọi callback.',
+           [({'callback': n}, metrics[n]['calls']) for n in names])
+    metric('dashboard_callback_errors_total', 'counter', 'Số lần callback phát sinh lỗi.',
+           [({'callback': n}, metrics[n]['errors']) for n in names])
+    histogram = []
+    for n in names:
+        for bound, count in zip(METRICS_DURATION_BUCKETS, metrics[n]['buckets']):
+            histogram.append(({'callback': n, 'le': bound}, count))
+        histogram.append(({'callback': n, 'le': '+Inf'}, metrics[n]['calls']))
+    lines.append('# HELP dashboard_callback_duration_seconds Thời gian chạy callback.')
+    lines.append('# TYPE dashboard_callback_duration_seconds histogram')
+    for labels, value in histogram:
+        lines.append(f'dashboard_callback_duration_seconds_bucket{{callback="{labels["callback"]}",le="{labels["le"]}"}} {value}')
+    for n in names:
+        lines.append(f'dashboard_callback_duration_seconds_sum{{callback="{n}"}} {metrics[n]["duration_sum"]}')
+        lines.append(f'dashboard_callback_duration_seconds_count{{callback="{n}"}} {metrics[n]["calls"]}')
+    metric('dashboard_callback_deserialize_seconds_total', 'counter', 'Thời gian giải mã dữ liệu trong callback.',
+           [({'callback': n}, metrics[n]['deserialize_sum']) for n in names])
+    metric('dashboard_callback_response_bytes_total', 'counter', 'Tổng số byte phản hồi của callback.',
+           [({'callback': n}, metrics[n]['response_bytes']) for n in names])
+    metric('dashboard_ingest_table_bytes', 'gauge', 'Bộ nhớ bảng vừa đọc trước/sau khi áp dụng kiểu gọn.',
+           [({'table': name, 'dtypes': label}, size)
+            for name, sizes in sorted(ingest_memory_report.items())
+            for label, size in zip(('raw', 'compact'), sizes)])
+    cache_stats = figure_cache.stats()
+    metric('dashboard_figure_cache_hits_total', 'counter', 'Số lần trúng bộ đệm biểu đồ.', [({}, cache_stats['hits'])])
+    metric('dashboard_figure_cache_misses_total', 'counter', 'Số lần trượt bộ đệm biểu đồ.', [({}, cache_stats['misses'])])
+    metric('dashboard_figure_cache_entries', 'gauge', 'Số biểu đồ đang lưu trong bộ đệm.', [({}, cache_stats['entries'])])
+    return '\n'.join(lines) + '\n'
+
+
+if METRICS_ENABLED:
+    @server.after_request
+    def record_callback_response_bytes(response):
+        name = flask.g.pop('metrics_callback', None)
+        if name is not None and response.content_length is not None:
+            with _callback_metrics_lock:
+                _metrics_entry(name)['response_bytes'] += response.content_length
+        return response
+
+    @server.route('/metrics')
+    def metrics_endpoint():
+        return flask.Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+    # POST: lấy mẫu cProfile ở lần gọi tiếp theo của callback; GET: xem kết quả gần nhất
+    @server.route('/metrics/profile/<name>', methods=['GET', 'POST'])
+    def profile_endpoint(name):
+        with _callback_metrics_lock:
+            if flask.request.method == 'POST':
+                _profile_requests.add(name)
+                return flask.Response(f'Sẽ lấy mẫu cProfile ở lần gọi tiếp theo của {name}\n',
+                                      status=202, mimetype='text/plain')
+            result = _profile_results.get(name)
+        if result is None:
+            return flask.Response('Chưa có mẫu cProfile\n', status=404, mimetype='text/plain')
+        return flask.Response(result, mimetype='text/plain')
+
+
 # Navbar
 navbar = dbc.Navbar(
     dbc.Container([
@@ -41,6 +617,21 @@ navbar = dbc.Navbar(
     className="mb-4",
 )
 
+# Bảng chi tiết rủi ro chạy ở chế độ custom: phân trang, sắp xếp và lọc được thực
+# hiện trên server, trình duyệt chỉ nhận trang đang xem với các cột đang hiển thị
+RISK_TABLE_PAGE_SIZE = int(os.environ.get('DASHBOARD_RISK_TABLE_PAGE_SIZE', 10))
+RISK_TABLE_COLUMNS = ['RiskID', 'RiskDescription', 'ImpactLevel', 'Probability', 'RiskScore', 'RiskStatus', 'RiskOwner', 'RiskTrigger', 'ContingencyPlan', 'ResidualRisk']
+
+# Biểu đồ biến động ngân sách vẽ từ bảng tổng hợp (stage_portfolio_summary): N dự án
+# biến động cao nhất / thấp nhất hoặc phân bố theo khoảng, không vẽ mỗi dự án một cột
+BUDGET_TOP_N_OPTIONS = [10, 20, 50]
+VARIANCE_BUCKETS = 30
+
+# Ma trận rủi ro danh mục: số rủi ro theo ô tác động × xác suất (mức 1..3) của các
+# dự án đang lọc; bấm vào một ô để xem tối đa RISK_HEATMAP_PROJECT_LIMIT dự án
+RISK_LEVEL_LABELS = ['Thấp', 'Trung bình', 'Cao']
+RISK_HEATMAP_PROJECT_LIMIT = int(os.environ.get('DASHBOARD_RISK_HEATMAP_PROJECTS', 20))
+
 # Tạo bố cục bảng điều khiển (đặt sẵn trong layout)
 dashboard_layout = html.Div([
     # Bộ lọc
@@ -74,8 +665,11 @@ dashboard_layout = html.Div([
     ], className='mb-4'),
     # Lưu trữ dữ liệu đã xử lý
     dcc.Store(id='projects-extended-data'),
+    dcc.Store(id='milestones-processed-data'),
     dcc.Store(id='resources-processed-data'),
     dcc.Store(id='risks-processed-data'),
+    # Bản chiếu gọn của bảng dự án cho chế độ lọc phía trình duyệt
+    dcc.Store(id='progress-projection'),
     # Tabs
     dbc.Tabs([
         dbc.Tab(label='Tổng quan', tab_id='tab-overview', children=[
@@ -145,12 +739,53 @@ dashboard_layout = html.Div([
                     dbc.Card([
                         dbc.CardBody([
                             html.H4("Biến động Ngân sách", className='card-title'),
+                            dbc.Row([
+                                dbc.Col(dbc.RadioItems(
+                                    id='budget-variance-mode',
+                                    options=[
+                                        {'label': 'Cao nhất / thấp nhất', 'value': 'top'},
+                                        {'label': 'Phân bố', 'value': 'histogram'},
+                                    ],
+                                    value='top',
+                                    inline=True,
+                                ), width=8),
+                                dbc.Col(dcc.Dropdown(
+                                    id='budget-variance-top-n',
+                                    options=[{'label': f'{n} dự án mỗi phía', 'value': n} for n in BUDGET_TOP_N_OPTIONS],
+                                    value=BUDGET_TOP_N_OPTIONS[0],
+                                    clearable=False,
+                                ), width=4),
+                            ], align='center'),
                             dcc.Graph(id='budget-variance-chart'),
                         ])
                     ], className="shadow-sm"),
                     width=6,
                 ),
             ], className='mb-4'),
+            # Ma trận rủi ro của toàn danh mục (theo bộ lọc rủi ro và tìm kiếm phía trên)
+            dbc.Row([
+                dbc.Col(
+                    dbc.Card([
+                        dbc.CardBody([
+                            html.H4("Ma trận Rủi ro Danh mục", className='card-title'),
+                            dbc.RadioItems(
+                                id='risk-heatmap-scope',
+                                options=[
+                                    {'label': 'Tất cả rủi ro', 'value': 'all'},
+                                    {'label': 'Rủi ro đang mở', 'value': 'open'},
+                                ],
+                                value='all',
+                                inline=True,
+                            ),
+                            dbc.Row([
+                                dbc.Col(dcc.Graph(id='portfolio-risk-heatmap'), width=7),
+                                dbc.Col(html.Div(id='risk-heatmap-projects'), width=5),
+                            ]),
+                        ])
+                    ], className="shadow-sm"),
+                    width=12,
+                ),
+            ], className='mb-4'),
             # Tiến độ Dự án Tổng thể với Thanh Tiến trình
             dbc.Row([
                 dbc.Col(
@@ -160,7 +795,27 @@ dashboard_layout = html.Div([
                                 html.I(className='fas fa-chart-line mr-2'),
                                 'Tiến độ Dự án Tổng thể'
                             ], className='card-title'),
+                            dbc.Row([
+                                dbc.Col([
+                                    html.Label('Sắp xếp theo:', className='font-weight-bold'),
+                                    dcc.Dropdown(
+                                        id='progress-sort',
+                                        options=[
+                                            {'label': 'Thứ tự trong tệp', 'value': 'default'},
+                                            {'label': 'Hoàn thành ít nhất', 'value': 'least_complete'},
+                                            {'label': 'Hoàn thành nhiều nhất', 'value': 'most_complete'},
+                                            {'label': 'Rủi ro cao nhất', 'value': 'most_at_risk'},
+                                            {'label': 'Tên dự án', 'value': 'name'},
+                                        ],
+                                        value='default',
+                                        clearable=False,
+                                    ),
+                                ], width=4),
+                                dbc.Col(html.Div(id='progress-summary', className='text-muted text-right mt-4'), width=8),
+                            ], className='mb-3'),
                             html.Div(id='project-progress-bars'),
+                            dbc.Pagination(id='progress-pagination', max_value=1, active_page=1,
+                                           fully_expanded=False, previous_next=True, className='mt-3'),
                         ])
                     ], className="shadow-sm"),
                     width=12
@@ -224,7 +879,34 @@ dashboard_layout = html.Div([
                         dbc.CardBody([
                             dcc.Graph(id='risk-matrix'),
                             html.H5('Chi tiết Rủi ro', className='mt-4'),
-                            html.Div(id='risk-table'),
+                            html.Div(id='risk-table-message'),
+                            dash_table.DataTable(
+                                id='risk-table',
+                                columns=[
+                                    {"name": i, "id": i, "hideable": True, "type": 'numeric' if i == 'RiskScore' else 'text'}
+                                    for i in RISK_TABLE_COLUMNS
+                                ],
+                                data=[],
+                                page_action='custom',
+                                page_current=0,
+                                page_size=RISK_TABLE_PAGE_SIZE,
+                                sort_action='custom',
+                                sort_mode='multi',
+                                sort_by=[],
+                                filter_action='custom',
+                                filter_query='',
+                                hidden_columns=[],
+                                style_cell={'textAlign': 'left', 'padding': '5px'},
+                                style_header={
+                                    'backgroundColor': '#f9f9f9',
+                                    'fontWeight': 'bold',
+                                    'border': '1px solid #e0e0e0',
+                                },
+                                style_data={
+                                    'border': '1px solid #e0e0e0',
+                                },
+                                style_table={'overflowX': 'auto'},
+                            ),
                         ]),
                     ], className="shadow-sm"),
                 ], width=12),
@@ -257,6 +939,12 @@ dashboard_layout = html.Div([
     ], id='tabs', active_tab='tab-overview'),
 ])
 
+# Nguồn dữ liệu phía máy chủ: thư mục có cấu trúc như data-demo/ (projects,
+# milestones, resources, risks dạng .xlsx hoặc .csv). Khi được đặt, phần tải lên bị
+# ẩn và mọi phiên dùng chung dữ liệu đọc từ thư mục (xem DataDirectorySource).
+DATA_DIR = os.environ.get('DASHBOARD_DATA_DIR')
+DATA_DIR_POLL_SECONDS = float(os.environ.get('DASHBOARD_DATA_DIR_POLL_SECONDS', 5))
+
 # Layout
 app.layout = dbc.Container([
     navbar,
@@ -304,12 +992,43 @@ app.layout = dbc.Container([
                 ], className='upload-box'),
             ], width=3),
         ], className='mb-3'),
+        # Sổ chi phí (tùy chọn): các dòng Date, ProjectID, Amount cho biểu đồ chi phí thực tế
+        dbc.Row([
+            dbc.Col([
+                html.Div([
+                    html.Label('Tải lên sổ chi phí (tùy chọn):', className='font-weight-bold'),
+                    dcc.Upload(
+                        id='upload-costs',
+                        children=dbc.Button('Chọn tệp Chi phí', color='secondary', className='mt-2'),
+                        multiple=False
+                    ),
+                    dbc.Checklist(
+                        id='cost-ledger-append',
+                        options=[{'label': 'Bổ sung vào sổ chi phí đã tải', 'value': 'append'}],
+                        value=[],
+                        switch=True,
+                        className='mt-2',
+                    ),
+                    html.Div(id='cost-ledger-message', className='text-muted mt-1'),
+                ], className='upload-box'),
+            ], width=6),
+        ], className='mb-3'),
         dbc.Row([
             dbc.Col([
                 dbc.Button('Tải Bảng điều khiển', id='load-dashboard-button', color='success', className='mr-2', n_clicks=0)
             ], width=12, className='text-center')
         ]),
-    ], className='upload-section'),
+        # Tiến độ xử lý dữ liệu chạy nền
+        html.Div([
+            html.Div(id='ingest-stage', className='text-muted mb-1'),
+            dbc.Progress(id='ingest-progress', value=0, striped=True, animated=True, className='mb-2'),
+            dbc.Button('Hủy', id='cancel-ingest-button', color='danger', size='sm', n_clicks=0),
+        ], id='ingest-status', style={'display': 'none'}, className='mt-3'),
+        dcc.Interval(id='ingest-poll', interval=500, disabled=True),
+        dcc.Store(id='ingest-job'),
+    ], className='upload-section', style={'display': 'none'} if DATA_DIR else {}),
+    # Kiểm tra dữ liệu mới từ thư mục nguồn (chỉ khi đặt DASHBOARD_DATA_DIR)
+    dcc.Interval(id='source-poll', interval=DATA_DIR_POLL_SECONDS * 1000, disabled=not DATA_DIR),
     # Thông báo tải lên thành công
     dbc.Alert(id='upload-alert', is_open=False, duration=4000),
     # Store components
@@ -317,6 +1036,7 @@ app.layout = dbc.Container([
     dcc.Store(id='milestones-data'),
     dcc.Store(id='resources-data'),
     dcc.Store(id='risks-data'),
+    dcc.Store(id='cost-ledger-data'),
     # Nội dung Bảng điều khiển (ẩn ban đầu)
     html.Div(id='dashboard-content', style={'display': 'none'}),
     # Dummy output cho clientside callback
@@ -345,34 +1065,740 @@ app.clientside_callback(
 )
 
 # Hàm phân tích nội dung tệp tải lên
-def parse_contents(contents, filename):
+# Nội dung base64 được giải mã dần vào tệp tạm (không giữ thêm bản sao đầy đủ
+# trong bộ nhớ). CSV được đọc theo từng khối UPLOAD_ROWS_PER_CHUNK dòng và mỗi khối
+# được áp kiểu gọn (TABLE_SCHEMAS) ngay khi đọc, nên chỉ các khối đã thu gọn cùng một
+# khối thô được giữ cùng lúc; xlsx được đọc bằng bộ duyệt dòng read-only của openpyxl.
+# Log ghi RSS của tiến trình trước và sau mỗi lần đọc (các tác vụ đọc chạy song song
+# cũng được tính vào phần chênh lệch).
+UPLOAD_DECODE_CHUNK_CHARS = 4 * 1024 * 1024  # bội số của 4 để giải mã base64 từng khối
+UPLOAD_ROWS_PER_CHUNK = 50000
+
+
+def decode_upload_to_file(content_string, file_obj):
+    for start in range(0, len(content_string), UPLOAD_DECODE_CHUNK_CHARS):
+        file_obj.write(base64.b64decode(content_string[start:start + UPLOAD_DECODE_CHUNK_CHARS]))
+    file_obj.seek(0)
+
+
+# RSS hiện tại của tiến trình (MB); None khi không có /proc (Windows, macOS)
+def current_rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def read_csv_chunked(file_obj, table=None):
+    schema = TABLE_SCHEMAS.get(table)
+    # Cột category luôn đọc dạng chuỗi để mọi khối có cùng kiểu
+    dtype = {col: str for col in schema['category']} if schema else None
+    frames = []
+    before = 0
+    for chunk in pd.read_csv(file_obj, encoding='utf-8', chunksize=UPLOAD_ROWS_PER_CHUNK, dtype=dtype):
+        if schema:
+            before += frame_memory(chunk)
+            chunk = compact_table(schema, chunk)
+        frames.append(chunk)
+    if not frames:
+        return pd.DataFrame()
+    df = concat_chunks(frames)
+    if schema:
+        # Các khối có thể được thu nhỏ về kiểu số nguyên khác nhau
+        df = downcast_integers(schema, df)
+        report_table_memory(table, before, df)
+    return df
+
+
+# Nối các khối đã thu gọn: cột category được đưa về cùng danh mục (hợp các danh
+# mục) để pd.concat giữ kiểu category thay vì chuyển thành object
+def concat_chunks(frames):
+    if len(frames) == 1:
+        return frames[0]
+    for col in frames[0].columns:
+        if all(isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames):
+            categories = pd.api.types.union_categoricals([frame[col] for frame in frames], ignore_order=True).categories
+            for frame in frames:
+                frame[col] = frame[col].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+def read_xlsx_streaming(file_obj):
+    workbook = openpyxl.load_workbook(file_obj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        # Bỏ các ô tiêu đề trống ở cuối (cột chỉ có định dạng, không có dữ liệu)
+        header = list(header)
+        while header and header[-1] is None:
+            header.pop()
+        columns = [name if name is not None else f'Unnamed: {i}' for i, name in enumerate(header)]
+        frames = []
+        batch = []
+        for row in rows:
+            # Bỏ qua các dòng trống (openpyxl trả về cả dòng chỉ có định dạng)
+            if all(value is None for value in row):
+                continue
+            batch.append(row[:len(columns)])
+            if len(batch) >= UPLOAD_ROWS_PER_CHUNK:
+                frames.append(pd.DataFrame.from_records(batch, columns=columns))
+                batch = []
+        if batch or not frames:
+            frames.append(pd.DataFrame.from_records(batch, columns=columns))
+    finally:
+        workbook.close()
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+# table: tên bảng trong TABLE_SCHEMAS để áp kiểu gọn ngay khi đọc (None: giữ nguyên)
+def read_table_file(file_obj, filename, table=None):
+    if filename.lower().endswith('.xls'):
+        # Định dạng Excel cũ không đọc được bằng openpyxl
+        return apply_table_schema(table, pd.read_excel(file_obj))
+    elif 'xls' in filename:
+        # Giả sử rằng người dùng đã tải lên một tệp Excel
+        return apply_table_schema(table, read_xlsx_streaming(file_obj))
+    else:
+        # Giả sử rằng người dùng đã tải lên một tệp CSV
+        return read_csv_chunked(file_obj, table)
+
+
+def parse_contents(contents, filename, table=None):
     if contents is None:
         return None
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
+    content_type, content_string = contents.split(',', 1)
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    try:
+        with tempfile.TemporaryFile() as upload_file:
+            decode_upload_to_file(content_string, upload_file)
+            df = read_table_file(upload_file, filename, table)
+    except Exception as e:
+        print(e)
+        return None
+    finally:
+        record_deserialize_time(time.perf_counter() - start)
+    rss_after = current_rss_mb()
+    if rss_before is not None and rss_after is not None:
+        print(f"Đã đọc {filename}: {len(df)} dòng, RSS tiến trình {rss_before:.1f} -> {rss_after:.1f} MB "
+              f"({rss_after - rss_before:+.1f} MB)")
+    return df
+
+
+# Kiểu dữ liệu gọn cho từng bảng, áp dụng một lần khi đọc tệp: cột trạng thái / mức /
+# loại (ít giá trị) thành category (đã bỏ khoảng trắng thừa), cột ngày thành datetime64,
+# cột số nguyên (mã, giờ, phần trăm) được thu nhỏ kiểu. Cột tên người, khách hàng giữ
+# object: gần như mỗi dòng một giá trị nên category chỉ tốn thêm bảng mã. Cột tiền giữ
+# int64/float64 để tránh tràn số.
+TABLE_SCHEMAS = {
+    'projects': {
+        'category': ['ProjectStatus', 'Priority', 'ProjectPhase'],
+        'date': ['StartDate', 'EndDate', 'ExpectedEndDate'],
+        'integer': ['ProjectID'],
+    },
+    'milestones': {
+        'category': ['Status', 'MilestoneType'],
+        'date': ['MilestoneStartDate', 'MilestoneEndDate', 'ActualCompletionDate'],
+        'integer': ['ProjectID', 'MilestoneID', 'PercentComplete'],
+    },
+    'resources': {
+        'category': ['Role', 'ResourceType', 'Availability'],
+        'date': [],
+        'integer': ['ResourceID', 'ProjectID', 'AllocatedHours', 'TotalCapacity', 'ActualHoursWorked', 'OvertimeHours'],
+    },
+    'risks': {
+        'category': ['ImpactLevel', 'Probability', 'RiskCategory', 'RiskStatus'],
+        'date': ['DateIdentified', 'RiskReviewDate'],
+        'integer': ['ProjectID'],
+    },
+    'costs': {
+        'category': [],
+        'date': ['Date'],
+        'integer': ['ProjectID'],
+    },
+}
+# Báo cáo bộ nhớ lần đọc gần nhất của mỗi bảng: {tên bảng: (byte trước, byte sau)}
+ingest_memory_report = {}
+
+
+def frame_memory(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+def apply_table_schema(name, df):
+    schema = TABLE_SCHEMAS.get(name)
+    if schema is None:
+        return df
+    before = frame_memory(df)
+    df = compact_table(schema, df)
+    report_table_memory(name, before, df)
+    return df
+
+
+def report_table_memory(name, before, df):
+    after = frame_memory(df)
+    ingest_memory_report[name] = (before, after)
+    print(f"Bộ nhớ {name}: {before / 1024 / 1024:.1f} MB -> {after / 1024 / 1024:.1f} MB")
+
+
+def compact_table(schema, df):
+    df = df.copy()
+    for col in schema['date']:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    for col in schema['category']:
+        if col in df.columns and df[col].dtype == object:
+            # Giá trị không phải chuỗi (số, ngày) được giữ nguyên; cột không có chuỗi
+            # nào thì không dùng được .str
+            if pd.api.types.infer_dtype(df[col], skipna=True) in ('string', 'mixed', 'mixed-integer'):
+                stripped = df[col].str.strip()
+                df[col] = stripped.where(stripped.notna(), df[col])
+            df[col] = df[col].astype('category')
+    return downcast_integers(schema, df)
+
+
+def downcast_integers(schema, df):
+    for col in schema['integer']:
+        if col in df.columns and pd.api.types.is_integer_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
+
+
+# So khớp giá trị đã chuẩn hóa (bỏ khoảng trắng, chữ thường) với values; với cột
+# category chỉ chuẩn hóa danh mục thay vì từng dòng
+def normalized_isin(series, values):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        if categories.dtype != object:
+            return pd.Series(False, index=series.index)
+        matches = np.append(categories.str.strip().str.lower().isin(values), False)
+        # Mã -1 (giá trị thiếu) trỏ tới phần tử False cuối cùng
+        return pd.Series(matches[series.cat.codes.to_numpy()], index=series.index)
+    return series.str.strip().str.lower().isin(values)
+
+
+# Chỉ mục ProjectID -> (vị trí bắt đầu, vị trí kết thúc) trên DataFrame đã sắp xếp
+# ổn định theo ProjectID (giữ nguyên thứ tự các dòng trong cùng một dự án).
+# Chọn một dự án chỉ còn là một phép cắt iloc thay vì quét toàn bộ bảng.
+def build_project_index(df):
+    df_sorted = df.sort_values('ProjectID', kind='stable').reset_index(drop=True)
+    ids = df_sorted['ProjectID'].to_numpy()
+    if len(ids) == 0:
+        return df_sorted, {}
+    boundaries = np.flatnonzero(ids[1:] != ids[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(ids)]))
+    index = dict(zip(ids[starts].tolist(), zip(starts.tolist(), ends.tolist())))
+    return df_sorted, index
+
+
+# Chỉ mục vị trí dòng đầu tiên của mỗi ProjectID, không thay đổi thứ tự bảng dự án
+def build_project_position_index(df):
+    ids = df['ProjectID'].tolist()
+    index = {}
+    for position, project_id in enumerate(ids):
+        index.setdefault(project_id, (position, position + 1))
+    return index
+
+
+# Lấy các dòng của một dự án từ kho bằng chỉ mục '<tên bảng>_index' (hoặc truy vấn
+# SQLite khi bật); columns giới hạn các cột cần lấy
+def get_project_rows(dataset_id, name, project_id, columns=None):
+    if sqlite_store is not None:
+        rows = sqlite_store.project_rows(dataset_id, name, project_id, columns)
+        if rows is not None:
+            return rows
+    df = get_frame(dataset_id, name)
+    index = get_frame(dataset_id, name + '_index')
+    if df is None or index is None:
+        return None
+    start, end = index.get(project_id, (0, 0))
+    rows = df.iloc[start:end]
+    if columns is not None:
+        rows = rows[[col for col in columns if col in rows.columns]]
+    return decategorize(rows)
+
+
+# Các dòng của một dự án chỉ chứa vài giá trị của mỗi cột category: đổi về chuỗi để
+# plotly express không nhóm theo cả các danh mục không xuất hiện
+def decategorize(df):
+    columns = [col for col, dtype in df.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+    if not columns:
+        return df
+    return df.astype({col: object for col in columns})
+
+
+# Lấy bản ghi (Series) của một dự án trong bảng dự án mở rộng
+def get_project_record(dataset_id, project_id):
+    rows = get_project_rows(dataset_id, 'projects_extended', project_id)
+    if rows is None or rows.empty:
+        return None
+    return rows.iloc[0]
+
+
+# Chuẩn hóa chuỗi để tìm kiếm: bỏ dấu tiếng Việt (kể cả đ/Đ), không phân biệt
+# hoa thường, gộp khoảng trắng
+def normalize_search_text(text):
+    text = unicodedata.normalize('NFD', str(text).replace('đ', 'd').replace('Đ', 'D'))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(text.casefold().split())
+
+
+# Chỉ mục n-gram trên tên dự án đã chuẩn hóa, dựng bằng giai đoạn project_search
+# và lưu cùng dataset nên mọi worker dùng lại được. Mỗi n-gram (1, 2 hoặc 3 ký tự,
+# mã hóa thành số nguyên, 21 bit mỗi ký tự) có danh sách mục đã sắp xếp
+# vị trí dòng * stride (+ vị trí ký tự trong tên với 3-gram). Truy vấn tới 3 ký tự là
+# một lần tra; truy vấn dài hơn là giao các 3-gram theo đúng khoảng cách trong
+# truy vấn (khớp chuỗi con chính xác, không cần so lại từng tên).
+SEARCH_GRAM_SIZE = 3
+SEARCH_BUILD_ROWS = 20000
+
+
+def search_gram_key(gram):
+    key = 0
+    for ch in gram:
+        key = (key << 21) | ord(ch)
+    return key
+
+
+def build_search_frames(names):
+    names = [normalize_search_text(name) if pd.notnull(name) else '' for name in names]
+    max_length = max((len(name) for name in names), default=0)
+    stride = max_length + 1
+    keys = []
+    entries = []
+    for base in range(0, len(names), SEARCH_BUILD_ROWS):
+        block = names[base:base + SEARCH_BUILD_ROWS]
+        block_length = max((len(name) for name in block), default=0)
+        if block_length == 0:
+            continue
+        codes = np.array(block, dtype=f'U{block_length}').view(np.uint32).reshape(len(block), block_length).astype(np.int64)
+        lengths = np.fromiter((len(name) for name in block), dtype=np.int64, count=len(block))
+        for size in range(1, SEARCH_GRAM_SIZE + 1):
+            width = block_length - size + 1
+            if width <= 0:
+                continue
+            gram = np.zeros((len(block), width), dtype=np.int64)
+            for i in range(size):
+                gram = (gram << 21) | codes[:, i:i + width]
+            valid = np.arange(width)[None, :] + size <= lengths[:, None]
+            rows, offsets = np.nonzero(valid)
+            keys.append(gram[valid])
+            entries.append((rows + base) * stride + (offsets if size == SEARCH_GRAM_SIZE else 0))
+    keys = np.concatenate(keys) if keys else np.array([], dtype=np.int64)
+    entries = np.concatenate(entries) if entries else np.array([], dtype=np.int64)
+    order = np.lexsort((entries, keys))
+    keys, entries = keys[order], entries[order]
+    # 1-gram và 2-gram lặp lại trong cùng một tên chỉ giữ một mục
+    keep = np.ones(len(keys), dtype=bool)
+    keep[1:] = (keys[1:] != keys[:-1]) | (entries[1:] != entries[:-1])
+    keys, entries = keys[keep], entries[keep]
+    grams, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+    if stride * len(names) < 2 ** 31:
+        entries = entries.astype(np.int32)
+    return {
+        'search_grams': pd.DataFrame({'Gram': grams, 'Start': starts, 'Count': counts}),
+        'search_postings': pd.DataFrame({'Entry': entries}),
+        'search_meta': pd.DataFrame({'Stride': [stride], 'Size': [len(names)]}),
+    }
+
+
+class ProjectSearchIndex:
+    def __init__(self, frames):
+        self.grams = frames['search_grams']['Gram'].to_numpy()
+        self.starts = frames['search_grams']['Start'].to_numpy()
+        self.counts = frames['search_grams']['Count'].to_numpy()
+        self.entries = frames['search_postings']['Entry'].to_numpy()
+        self.stride = int(frames['search_meta']['Stride'].iloc[0])
+        self.size = int(frames['search_meta']['Size'].iloc[0])
+
+    def _postings(self, gram):
+        i = np.searchsorted(self.grams, search_gram_key(gram))
+        if i == len(self.grams) or self.grams[i] != search_gram_key(gram):
+            return None
+        return self.entries[self.starts[i]:self.starts[i] + self.counts[i]]
+
+    @staticmethod
+    def _unique_sorted(positions):
+        if len(positions) < 2:
+            return positions
+        return positions[np.r_[True, positions[1:] != positions[:-1]]]
+
+    # Vị trí bắt đầu (mục của 3-gram đầu tiên) thỏa mọi 3-gram ở đúng khoảng cách
+    @staticmethod
+    def _chain(candidates, postings):
+        for offset, entries in postings:
+            probe = candidates + offset
+            found = np.minimum(np.searchsorted(entries, probe), len(entries) - 1)
+            candidates = candidates[entries[found] == probe]
+        return candidates
+
+    # Trả về vị trí (tăng dần) các dòng có tên chứa query; limit giới hạn số kết quả
+    # (type-ahead): mục của 3-gram hiếm nhất được xét theo từng khối và dừng khi đủ
+    def search(self, query, limit=None):
+        query = normalize_search_text(query)
+        if not query:
+            return np.arange(self.size if limit is None else min(limit, self.size))
+        size = min(len(query), SEARCH_GRAM_SIZE)
+        postings = []
+        for offset in range(len(query) - size + 1):
+            entries = self._postings(query[offset:offset + size])
+            if entries is None:
+                return np.array([], dtype=np.int64)
+            postings.append((offset, entries))
+        if len(postings) == 1:
+            positions = self._unique_sorted(postings[0][1] // self.stride)
+            return positions if limit is None else positions[:limit]
+
+        postings.sort(key=lambda posting: len(posting[1]))
+        offset, rarest = postings[0]
+        others = [(other_offset - offset, entries) for other_offset, entries in postings[1:]]
+        block = len(rarest) if limit is None else max(limit * 16, 4096)
+        positions = np.array([], dtype=np.int64)
+        for start in range(0, len(rarest), block):
+            candidates = rarest[start:start + block]
+            # Chỉ giữ vị trí mà cả truy vấn nằm gọn trong tên, để phép cộng khoảng
+            # cách không tràn sang dòng kế tiếp
+            query_start = candidates % self.stride - offset
+            candidates = candidates[(query_start >= 0) & (query_start + len(query) < self.stride)]
+            matches = self._chain(candidates, others) // self.stride
+            positions = self._unique_sorted(np.concatenate([positions, matches]))
+            if limit is not None and len(positions) >= limit:
+                return positions[:limit]
+        return positions
+
+
+# Chỉ mục của mỗi dataset được đọc từ kho một lần cho mỗi worker; dataset tạo trước
+# khi có giai đoạn project_search thì dựng và lưu lại ngay lúc này
+search_index_cache = LRUCache(8)
+
+
+def get_project_search_index(dataset_id):
+    df_projects_extended = get_frame(dataset_id, 'projects_extended')
+    if df_projects_extended is None:
+        return None
+
+    def compute():
+        search_id = stage_key('project_search', [dataset_id])
+        frames = get_dataset(search_id)
+        if frames is None:
+            frames = stage_project_search({'projects_extended': df_projects_extended})
+            register_dataset(frames, search_id)
+        return ProjectSearchIndex(frames)
+
+    return search_index_cache.get_or_compute(dataset_id, compute)
+
+
+# Hàm tính toán tiến độ dự án: trung bình PercentComplete của các mốc theo ProjectID
+# (một lần groupby thay cho việc lọc df_milestones cho từng dự án).
+# Dự án không có mốc nào nhận giá trị 0.
+def calculate_project_completion(df_projects, df_milestones):
+    df_projects_extended = df_projects.copy()
+    if 'PercentComplete' not in df_milestones.columns:
+        df_projects_extended['PercentComplete'] = 0
+        return df_projects_extended
+    completion = df_milestones.groupby('ProjectID', sort=False)['PercentComplete'].mean()
+    has_milestones = df_projects_extended['ProjectID'].isin(completion.index)
+    percent_complete = df_projects_extended['ProjectID'].map(completion)
+    df_projects_extended['PercentComplete'] = percent_complete.where(has_milestones, 0)
+    return df_projects_extended
+
+
+# Tính toán giá trị thu được (earned value) cho toàn bộ dự án cùng lúc.
+# Trả về DataFrame cùng index với df_projects gồm thời lượng (ngày), SPI và CPI;
+# mọi giá trị thiếu đều lan truyền thành NaN. Dùng được ngoài callback (batch job).
+def calculate_earned_value(df_projects):
+    def to_datetime(col):
+        return pd.to_datetime(df_projects[col], errors='coerce')
+
+    start_date = to_datetime('StartDate')
+    one_day = np.timedelta64(1, 'D')
+    total_duration = (to_datetime('ExpectedEndDate') - start_date) / one_day
+    planned_duration = (to_datetime('EndDate') - start_date) / one_day
+
+    percent_complete = pd.to_numeric(df_projects['PercentComplete'], errors='coerce') / 100
+    schedule_variance = percent_complete * total_duration
+    spi = (schedule_variance / planned_duration).where(planned_duration > 0)
+
+    budget = pd.to_numeric(df_projects['Budget'], errors='coerce')
+    actual_cost = pd.to_numeric(df_projects['ActualCost'], errors='coerce')
+    cpi = (budget / actual_cost).where(actual_cost > 0)
+
+    return pd.DataFrame({
+        'TotalDuration': total_duration.astype(float),
+        'PlannedDuration': planned_duration.astype(float),
+        'SPI': spi.astype(float),
+        'CPI': cpi.astype(float),
+    }, index=df_projects.index)
+
+
+# Tác vụ nền: đọc tệp tải lên và xử lý dữ liệu trên một ThreadPoolExecutor cục bộ
+# để request không giữ worker gunicorn suốt quá trình xử lý. Trạng thái của tác vụ
+# được ghi ra JOB_DIR (JSON) nên worker nào nhận request thăm dò cũng đọc được;
+# yêu cầu hủy là một tệp đánh dấu, được kiểm tra ở đầu mỗi giai đoạn.
+JOB_DIR = os.environ.get('DASHBOARD_JOB_DIR', os.path.join(tempfile.gettempdir(), 'dashboard-jobs'))
+JOB_WORKERS = int(os.environ.get('DASHBOARD_JOB_WORKERS', 2))
+JOB_STATUS_TTL = 24 * 3600
+JOB_STAGES = [
+    ('parse', 'Đọc tệp'),
+    ('dates', 'Chuyển đổi ngày tháng'),
+    ('completion', 'Tính tiến độ dự án'),
+    ('risk', 'Chấm điểm rủi ro'),
+    ('spi_cpi', 'Tính SPI/CPI'),
+    ('resources', 'Tính mức sử dụng tài nguyên'),
+    ('save', 'Tổng hợp dự án và KPI'),
+]
+job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='ingest')
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _job_path(job_id, suffix):
+    if not job_id or not re.fullmatch(r'[0-9a-f]{32}', job_id):
+        return None
+    return os.path.join(JOB_DIR, job_id + suffix)
+
+
+def write_job_status(job_id, **status):
+    path = _job_path(job_id, '.json')
+    tmp_path = f'{path}.tmp-{os.getpid()}-{threading.get_ident()}'
+    try:
+        os.makedirs(JOB_DIR, exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(status, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Không thể ghi trạng thái tác vụ {job_id}: {e}")
+
+
+def read_job_status(job_id):
+    path = _job_path(job_id, '.json')
+    if path is None:
+        return None
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def cancel_job(job_id):
+    path = _job_path(job_id, '.cancel')
+    if path is None:
+        return
+    try:
+        os.makedirs(JOB_DIR, exist_ok=True)
+        open(path, 'w').close()
+    except OSError as e:
+        print(f"Không thể hủy tác vụ {job_id}: {e}")
+
+
+def _prune_job_dir():
+    now = time.time()
     try:
-        if 'xls' in filename:
-            # Giả sử rằng người dùng đã tải lên một tệp Excel
-            df = pd.read_excel(io.BytesIO(decoded))
+        for name in os.listdir(JOB_DIR):
+            path = os.path.join(JOB_DIR, name)
+            if now - os.path.getmtime(path) > JOB_STATUS_TTL:
+                os.remove(path)
+    except OSError:
+        pass
+
+
+# Phiên bản mã đọc tệp / xử lý dữ liệu: tăng khi thay đổi parse_contents hoặc
+# process_dataset để bộ đệm theo nội dung không trả về kết quả cũ
+PARSE_VERSION = 4
+PROCESSING_VERSION = 1
+
+
+# Mã dataset theo nội dung tệp tải lên (bỏ phần tiền tố data URL vì kiểu MIME phụ
+# thuộc trình duyệt); tải lên lại cùng tệp cho cùng mã nên không phải đọc lại
+def ingest_key(name, contents, filename):
+    _, ext = os.path.splitext(filename or '')
+    # sha256 có tăng tốc phần cứng trên hầu hết CPU, nhanh hơn blake2b với tệp lớn
+    digest = hashlib.sha256(f'{name}:{PARSE_VERSION}:{ext.lower()}:'.encode('utf-8'))
+    # Băm từng đoạn như decode_upload_to_file, không tạo bản sao bytes của cả chuỗi
+    for start in range(contents.find(',') + 1, len(contents), UPLOAD_DECODE_CHUNK_CHARS):
+        digest.update(contents[start:start + UPLOAD_DECODE_CHUNK_CHARS].encode('ascii', errors='replace'))
+    return digest.hexdigest()[:32]
+
+
+# Đọc các tệp tải lên, mỗi tệp là một dataset riêng theo nội dung; trả về
+# {tên bảng: mã dataset} hoặc None nếu lỗi
+def parse_uploads(uploads, report=lambda stage, detail=None: None):
+    dataset_ids = {}
+    for number, (name, (contents, filename)) in enumerate(uploads.items(), start=1):
+        dataset_id = ingest_key(name, contents, filename)
+        if has_dataset(dataset_id):
+            report('parse', f'{filename} ({number}/{len(uploads)}, bộ nhớ đệm)')
         else:
-            # Giả sử rằng người dùng đã tải lên một tệp CSV
-            df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
+            report('parse', f'{filename} ({number}/{len(uploads)})')
+            df = parse_contents(contents, filename, name)
+            if df is None:
+                return None
+            # Lưu DataFrame vào kho phía máy chủ, dcc.Store chỉ giữ mã dataset
+            register_dataset({name: df}, dataset_id)
+        dataset_ids[name] = dataset_id
+    return dataset_ids
+
+
+def run_ingest_job(job_id, uploads):
+    cancel_path = _job_path(job_id, '.cancel')
+    stage_numbers = {stage: number for number, (stage, _) in enumerate(JOB_STAGES)}
+    stage_labels = dict(JOB_STAGES)
+
+    def report(stage, detail=None):
+        if os.path.exists(cancel_path):
+            raise JobCancelled()
+        label = stage_labels[stage] + (f': {detail}' if detail else '')
+        write_job_status(job_id, state='running', stage=label,
+                         progress=round(100 * stage_numbers[stage] / len(JOB_STAGES)))
+
+    try:
+        dataset_ids = parse_uploads(uploads, report)
+        if dataset_ids is None:
+            write_job_status(job_id, state='error', message='Lỗi khi tải dữ liệu')
+            return
+        raw_ids = [dataset_ids[name] for name in SOURCE_TABLES]
+        if process_dataset(raw_ids, report) is None:
+            write_job_status(job_id, state='error', message='Lỗi khi xử lý dữ liệu')
+            return
+        write_job_status(job_id, state='done', dataset_ids=raw_ids, progress=100)
+    except JobCancelled:
+        write_job_status(job_id, state='cancelled', message='Đã hủy xử lý dữ liệu')
+    except Exception as e:
+        print(f"Tác vụ xử lý dữ liệu {job_id} thất bại: {e}")
+        write_job_status(job_id, state='error', message='Lỗi khi xử lý dữ liệu')
+    finally:
+        if os.path.exists(cancel_path):
+            os.remove(cancel_path)
+
+
+def submit_ingest_job(uploads):
+    _prune_job_dir()
+    job_id = uuid.uuid4().hex
+    write_job_status(job_id, state='running', stage=JOB_STAGES[0][1], progress=0)
+    job_executor.submit(run_ingest_job, job_id, uploads)
+    return job_id
+
+
+def parse_file(path, table=None):
+    try:
+        with open(path, 'rb') as f:
+            df = read_table_file(f, os.path.basename(path), table)
     except Exception as e:
         print(e)
         return None
+    print(f"Đã đọc {path}: {len(df)} dòng")
     return df
 
-# Callback để tải dữ liệu từ các tệp tải lên
-@app.callback(
-    [Output('projects-data', 'data'),
-     Output('milestones-data', 'data'),
-     Output('resources-data', 'data'),
-     Output('risks-data', 'data'),
-     Output('upload-alert', 'children'),
-     Output('upload-alert', 'color'),
-     Output('upload-alert', 'is_open'),
-     Output('dashboard-content', 'children'),
-     Output('dashboard-content', 'style')],
+
+# Theo dõi DATA_DIR: một luồng nền kiểm tra mtime/kích thước các tệp nguồn mỗi
+# DATA_DIR_POLL_SECONDS giây, chỉ đọc lại tệp đã thay đổi rồi chạy process_dataset
+# (chỉ các giai đoạn phía sau tệp đó). Mã dataset suy ra từ (đường dẫn, mtime, kích
+# thước) nên worker gunicorn khác dùng lại dataset đã ghi trong DATASET_DIR.
+class DataDirectorySource:
+    EXTENSIONS = ('.xlsx', '.xls', '.csv')
+
+    def __init__(self, directory, poll_seconds):
+        self.directory = directory
+        self.poll_seconds = poll_seconds
+        self.signatures = {}
+        self.dataset_ids = {}
+        # Mã dataset gốc của lần xử lý hoàn chỉnh gần nhất (None khi chưa sẵn sàng)
+        self.current_ids = None
+        self.cost_ledger_id = None
+        self._thread = None
+
+    def find_file(self, table):
+        for ext in self.EXTENSIONS:
+            path = os.path.join(self.directory, table + ext)
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def refresh(self):
+        changed = set()
+        for table in SOURCE_TABLES + [COST_LEDGER_TABLE]:
+            path = self.find_file(table)
+            if path is None:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            signature = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+            if signature == self.signatures.get(table):
+                continue
+            key = 'source:{}:{}:{}:{}:{}'.format(table, PARSE_VERSION, *signature)
+            dataset_id = hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+            if not has_dataset(dataset_id):
+                if table == COST_LEDGER_TABLE:
+                    # Sổ chi phí được làm sạch (chọn cột, ép kiểu) trước khi áp kiểu gọn
+                    df = parse_file(path)
+                    df = clean_cost_ledger(df) if df is not None else None
+                    df = apply_table_schema(table, df) if df is not None else None
+                else:
+                    df = parse_file(path, table)
+                if df is None:
+                    continue
+                register_dataset({table: df}, dataset_id)
+            self.signatures[table] = signature
+            self.dataset_ids[table] = dataset_id
+            changed.add(table)
+        if changed & set(SOURCE_TABLES) and all(table in self.dataset_ids for table in SOURCE_TABLES):
+            raw_ids = [self.dataset_ids[table] for table in SOURCE_TABLES]
+            if process_dataset(raw_ids) is not None:
+                self.current_ids = raw_ids
+        # Sổ chi phí (tùy chọn) được tổng hợp lại toàn bộ khi tệp thay đổi
+        if COST_LEDGER_TABLE in changed:
+            self.cost_ledger_id = build_cost_ledger(self.dataset_ids[COST_LEDGER_TABLE])
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Lỗi khi đọc thư mục dữ liệu {self.directory}: {e}")
+            time.sleep(self.poll_seconds)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='data-dir-source', daemon=True)
+            self._thread.start()
+
+
+
+# Callback để tải dữ liệu từ các tệp tải lên: nút tải khởi chạy tác vụ nền và trả
+# mã tác vụ về ingest-job. Tiến độ, nút hủy và thư mục nguồn được xử lý ở
+# poll_ingest_job, callback chỉ mang mã tác vụ và mã dataset: nội dung base64 của
+# các tệp tải lên (State) chỉ được gửi lên một lần khi bấm nút, không phải mỗi
+# lần ingest-poll chạy.
+LOAD_OUTPUTS = [
+    ('projects-data', 'data'),
+    ('milestones-data', 'data'),
+    ('resources-data', 'data'),
+    ('risks-data', 'data'),
+    ('upload-alert', 'children'),
+    ('upload-alert', 'color'),
+    ('upload-alert', 'is_open'),
+    ('dashboard-content', 'children'),
+    ('dashboard-content', 'style'),
+    ('ingest-job', 'data'),
+    ('ingest-poll', 'disabled'),
+    ('ingest-status', 'style'),
+    ('ingest-progress', 'value'),
+    ('ingest-progress', 'label'),
+    ('ingest-stage', 'children'),
+]
+
+
+@instrumented_callback(
+    [Output(component_id, prop) for component_id, prop in LOAD_OUTPUTS],
     [Input('load-dashboard-button', 'n_clicks')],
     [State('upload-projects', 'contents'),
      State('upload-projects', 'filename'),
@@ -387,30 +1813,405 @@ def load_data(n_clicks, projects_contents, projects_filename,
               milestones_contents, milestones_filename,
               resources_contents, resources_filename,
               risks_contents, risks_filename):
+    no_stores = [dash.no_update] * 4
+    hidden = {'display': 'none'}
+
     if n_clicks > 0:
         # Kiểm tra xem tất cả các tệp đã được tải lên chưa
         if not all([projects_contents, milestones_contents, resources_contents, risks_contents]):
-            return [None, None, None, None, 'Vui lòng tải lên tất cả các tệp cần thiết', 'danger', True, dash.no_update, {'display': 'none'}]
-        # Phân tích các tệp tải lên
-        df_projects = parse_contents(projects_contents, projects_filename)
-        df_milestones = parse_contents(milestones_contents, milestones_filename)
-        df_resources = parse_contents(resources_contents, resources_filename)
-        df_risks = parse_contents(risks_contents, risks_filename)
-        if df_projects is None or df_milestones is None or df_resources is None or df_risks is None:
-            return [None, None, None, None, 'Lỗi khi tải dữ liệu', 'danger', True, dash.no_update, {'display': 'none'}]
-        else:
-            # Chuyển đổi DataFrame thành JSON để lưu trữ trong dcc.Store
-            projects_data = df_projects.to_json(date_format='iso', orient='split')
-            milestones_data = df_milestones.to_json(date_format='iso', orient='split')
-            resources_data = df_resources.to_json(date_format='iso', orient='split')
-            risks_data = df_risks.to_json(date_format='iso', orient='split')
-            return [projects_data, milestones_data, resources_data, risks_data, 'Tải dữ liệu thành công!', 'success', True, dashboard_layout, {'display': 'block'}]
+            return [None, None, None, None, 'Vui lòng tải lên tất cả các tệp cần thiết', 'danger', True, dash.no_update, {'display': 'none'},
+                    None, True, hidden, 0, '', '']
+        # Phân tích và xử lý các tệp tải lên trong tác vụ nền
+        job_id = submit_ingest_job({
+            'projects': (projects_contents, projects_filename),
+            'milestones': (milestones_contents, milestones_filename),
+            'resources': (resources_contents, resources_filename),
+            'risks': (risks_contents, risks_filename),
+        })
+        return no_stores + [dash.no_update] * 5 + [job_id, False, {'display': 'block'}, 0, '0%', JOB_STAGES[0][1]]
+    else:
+        return [dash.no_update] * 15
+
+
+# Theo dõi tác vụ nền (ingest-poll mỗi 500 ms), hủy tác vụ và nhận dữ liệu mới từ
+# thư mục nguồn; khi tác vụ xong thì đưa mã dataset vào các Store
+@instrumented_callback(
+    [Output(component_id, prop, allow_duplicate=True) for component_id, prop in LOAD_OUTPUTS],
+    [Input('ingest-poll', 'n_intervals'),
+     Input('cancel-ingest-button', 'n_clicks'),
+     Input('source-poll', 'n_intervals')],
+    [State('ingest-job', 'data'),
+     State('projects-data', 'data'),
+     State('milestones-data', 'data'),
+     State('resources-data', 'data'),
+     State('risks-data', 'data')],
+    prevent_initial_call=True
+)
+def poll_ingest_job(n_intervals, cancel_clicks, source_intervals, job_id,
+                    projects_data, milestones_data, resources_data, risks_data):
+    no_stores = [dash.no_update] * 4
+    hidden = {'display': 'none'}
+    trigger = triggered_id()
+
+    if trigger == 'source-poll':
+        # Chỉ gửi mã dataset mới khi dữ liệu trong thư mục nguồn đã thay đổi
+        current_ids = data_source.current_ids if data_source else None
+        loaded_ids = [projects_data, milestones_data, resources_data, risks_data]
+        if current_ids is None or current_ids == loaded_ids:
+            return [dash.no_update] * 15
+        if not any(loaded_ids):
+            return current_ids + ['Đã tải dữ liệu từ thư mục nguồn', 'success', True, dashboard_layout, {'display': 'block'}] + [dash.no_update] * 6
+        return current_ids + ['Dữ liệu đã được cập nhật từ thư mục nguồn', 'info', True] + [dash.no_update] * 8
+
+    if trigger == 'cancel-ingest-button':
+        if not job_id:
+            return [dash.no_update] * 15
+        cancel_job(job_id)
+        return [dash.no_update] * 14 + ['Đang hủy...']
+
+    if not job_id:
+        return [dash.no_update] * 15
+    status = read_job_status(job_id)
+    if status is None:
+        return no_stores + ['Không tìm thấy tác vụ xử lý dữ liệu', 'danger', True, dash.no_update, dash.no_update,
+                            None, True, hidden, 0, '', '']
+    if status['state'] == 'running':
+        return no_stores + [dash.no_update] * 5 + [
+            dash.no_update, False, {'display': 'block'}, status['progress'], f"{status['progress']}%", status['stage']]
+    if status['state'] == 'done':
+        return status['dataset_ids'] + ['Tải dữ liệu thành công!', 'success', True, dashboard_layout, {'display': 'block'},
+                                   None, True, hidden, 100, '', '']
+    return no_stores + [status['message'], 'warning' if status['state'] == 'cancelled' else 'danger', True,
+                        dash.no_update, dash.no_update, None, True, hidden, 0, '', '']
+
+# Xử lý dữ liệu gốc thành các bảng dẫn xuất theo từng giai đoạn có khai báo đầu vào
+# (bảng gốc hoặc giai đoạn khác). Kết quả mỗi giai đoạn là một dataset có mã suy ra
+# từ tên giai đoạn, PROCESSING_VERSION và mã các đầu vào, nên khi chỉ một tệp thay
+# đổi thì chỉ các giai đoạn phía sau tệp đó chạy lại; phần còn lại lấy từ kho.
+# Thứ tự khai báo là thứ tự chạy (và thứ tự tiến độ của tác vụ nền).
+KPI_COLUMNS = ['TotalProjects', 'ActiveProjects', 'CompletedProjects', 'AtRiskProjects']
+# Rủi ro đang mở có RiskScore từ ngưỡng này trở lên là rủi ro cao
+HIGH_RISK_THRESHOLD = 6
+SOURCE_TABLES = ['projects', 'milestones', 'resources', 'risks']
+PIPELINE_STAGES = OrderedDict()
+# Giai đoạn có bảng được ghi vào SQLite khi bật DASHBOARD_STORAGE=sqlite
+SQLITE_STAGES = ['milestones_processed', 'risks_processed', 'resources_processed', 'projects_extended']
+
+
+def pipeline_stage(name, inputs, progress):
+    def decorator(func):
+        PIPELINE_STAGES[name] = (inputs, progress, func)
+        return func
+    return decorator
+
+
+# Chuyển đổi các cột ngày tháng về định dạng datetime (trên bản sao)
+def parse_date_columns(df, columns):
+    df = df.copy()
+    for col in columns:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    return df
+
+
+@pipeline_stage('projects_dated', ['projects'], 'dates')
+def stage_projects_dated(raw):
+    return {'projects': parse_date_columns(raw['projects'], ['StartDate', 'EndDate', 'ExpectedEndDate'])}
+
+
+@pipeline_stage('milestones_processed', ['milestones'], 'dates')
+def stage_milestones_processed(raw):
+    df_milestones = parse_date_columns(raw['milestones'], ['MilestoneStartDate', 'MilestoneEndDate', 'ActualCompletionDate'])
+    # Sắp xếp theo ProjectID và tạo chỉ mục để chọn dự án bằng phép cắt
+    df_milestones, milestones_index = build_project_index(df_milestones)
+    return {'milestones': df_milestones, 'milestones_index': milestones_index}
+
+
+@pipeline_stage('completion', ['projects_dated', 'milestones_processed'], 'completion')
+def stage_completion(projects, milestones):
+    return {'projects_extended': calculate_project_completion(projects['projects'], milestones['milestones'])}
+
+
+# Burn-down của mọi dự án trong một lần: lưới tuần chung (chủ nhật, như
+# pd.date_range(freq='W')) từ ngày bắt đầu mốc sớm nhất tới ngày kết thúc / hoàn
+# thành muộn nhất. Mỗi mốc được gán tuần hoàn thành thực tế (ActualCompletionDate)
+# và tuần kết thúc kế hoạch (MilestoneEndDate) bằng searchsorted trên lưới; số mốc
+# đã xong của mỗi (dự án, tuần) là một searchsorted trên khóa (dự án, tuần) đã sắp
+# xếp. Mỗi dự án giữ các tuần trong khoảng [bắt đầu mốc sớm nhất, kết thúc mốc muộn nhất].
+def completed_by_week(project_codes, week_numbers, row_codes, row_weeks, weeks):
+    # Số mốc của mỗi dòng (dự án, tuần) có tuần hoàn thành <= tuần đó. Khóa (dự án,
+    # tuần); tuần weeks + 1 nghĩa là chưa hoàn thành
+    keys = np.sort(project_codes * (weeks + 2) + week_numbers)
+    return (np.searchsorted(keys, row_codes * (weeks + 2) + row_weeks, side='right')
+            - np.searchsorted(keys, row_codes * (weeks + 2), side='left'))
+
+
+@pipeline_stage('burndown', ['milestones_processed'], 'completion')
+def stage_burndown(milestones):
+    df_milestones = milestones['milestones']
+    columns = {'ProjectID': df_milestones['ProjectID'].iloc[:0], 'Date': pd.Series([], dtype='datetime64[ns]'),
+               'Remaining': pd.Series([], dtype=np.int32), 'Planned': pd.Series([], dtype=np.int32)}
+    start = df_milestones['MilestoneStartDate']
+    end = df_milestones['MilestoneEndDate']
+    actual = df_milestones['ActualCompletionDate']
+    first, last = start.min(), pd.concat([end, actual]).max()
+    if df_milestones.empty or pd.isnull(first) or pd.isnull(last):
+        return {'burndown': pd.DataFrame(columns), 'burndown_index': {}}
+    grid = pd.date_range(start=first.normalize(), end=last, freq='W')
+    weeks = len(grid)
+
+    # Mã dự án liên tiếp (bảng mốc đã sắp theo ProjectID)
+    project_ids, project_codes = np.unique(df_milestones['ProjectID'].to_numpy(), return_inverse=True)
+
+    def week_numbers(dates):
+        numbers = grid.searchsorted(dates.to_numpy(), side='left')
+        numbers[dates.isna().to_numpy()] = weeks + 1
+        return numbers
+
+    # Khoảng tuần của mỗi dự án, giống pd.date_range(start=min bắt đầu, end=max kết thúc)
+    grouped = pd.DataFrame({'code': project_codes, 'start': start, 'end': end}).groupby('code')
+    project_start = grouped['start'].min().reindex(range(len(project_ids)))
+    project_end = grouped['end'].max().reindex(range(len(project_ids)))
+    valid = (project_start.notna() & project_end.notna()).to_numpy()
+    lo = grid.searchsorted(project_start.to_numpy(), side='left')
+    hi = grid.searchsorted(project_end.to_numpy(), side='right')
+    lengths = np.where(valid, np.maximum(hi - lo, 0), 0)
+
+    row_codes = np.repeat(np.arange(len(project_ids)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    row_weeks = np.repeat(lo, lengths) + offsets
+    totals = np.bincount(project_codes, minlength=len(project_ids))[row_codes]
+
+    df_burndown = pd.DataFrame({
+        'ProjectID': project_ids[row_codes],
+        'Date': grid[row_weeks],
+        'Remaining': (totals - completed_by_week(project_codes, week_numbers(actual), row_codes, row_weeks, weeks)).astype(np.int32),
+        'Planned': (totals - completed_by_week(project_codes, week_numbers(end), row_codes, row_weeks, weeks)).astype(np.int32),
+    })
+    df_burndown, burndown_index = build_project_index(df_burndown)
+    return {'burndown': df_burndown, 'burndown_index': burndown_index}
+
+
+@pipeline_stage('risks_processed', ['risks'], 'risk')
+def stage_risks_processed(raw):
+    df_risks = parse_date_columns(raw['risks'], ['DateIdentified', 'RiskReviewDate'])
+
+    # Ánh xạ mức độ tác động và xác suất thành giá trị số
+    impact_mapping = {'Low': 1, 'Medium': 2, 'High': 3}
+    probability_mapping = {'Low': 1, 'Medium': 2, 'High': 3}
+
+    df_risks['ImpactLevelNum'] = df_risks['ImpactLevel'].astype(object).map(impact_mapping)
+    df_risks['ProbabilityNum'] = df_risks['Probability'].astype(object).map(probability_mapping)
+    df_risks['RiskScore'] = df_risks['ImpactLevelNum'] * df_risks['ProbabilityNum']
+
+    # Xác định các rủi ro cao
+    is_open = normalized_isin(df_risks['RiskStatus'], ['open'])
+    df_high_risks = df_risks[(df_risks['RiskScore'] >= HIGH_RISK_THRESHOLD) & is_open]
+
+    # Danh sách các ProjectID có rủi ro cao
+    at_risk_projects = pd.DataFrame({'ProjectID': df_high_risks['ProjectID'].unique()})
+
+    # Tổng điểm các rủi ro đang mở của mỗi dự án (dùng để sắp xếp theo mức rủi ro)
+    open_risk_score = df_risks[is_open].groupby('ProjectID')['RiskScore'].sum().reset_index(name='OpenRiskScore')
+
+    df_risks, risks_index = build_project_index(df_risks)
+    return {'risks': df_risks, 'risks_index': risks_index,
+            'at_risk_projects': at_risk_projects, 'open_risk_score': open_risk_score}
+
+
+@pipeline_stage('earned_value', ['completion'], 'spi_cpi')
+def stage_earned_value(completion):
+    earned_value = calculate_earned_value(completion['projects_extended'])
+    return {'earned_value': earned_value[['SPI', 'CPI']]}
+
+
+@pipeline_stage('resources_processed', ['resources'], 'resources')
+def stage_resources_processed(raw):
+    df_resources = raw['resources'].copy()
+    # Xử lý dữ liệu sử dụng tài nguyên
+    if 'AllocatedHours' in df_resources.columns and 'TotalCapacity' in df_resources.columns:
+        df_resources['Utilization'] = (df_resources['AllocatedHours'] / df_resources['TotalCapacity']) * 100
+        df_resources['Utilization'] = df_resources['Utilization'].round(2)
+    else:
+        df_resources['Utilization'] = 0
+    df_resources, resources_index = build_project_index(df_resources)
+    return {'resources': df_resources, 'resources_index': resources_index}
+
+
+@pipeline_stage('projects_extended', ['completion', 'earned_value', 'risks_processed'], 'save')
+def stage_projects_extended(completion, earned_value, risks):
+    df_projects_extended = completion['projects_extended'].copy()
+    at_risk_project_ids = risks['at_risk_projects']['ProjectID']
+
+    # Tính toán biến động ngân sách
+    df_projects_extended['BudgetVariance'] = df_projects_extended['Budget'] - df_projects_extended['ActualCost']
+
+    # Thêm cột 'IsAtRisk' và 'StatusIndicator'
+    df_projects_extended['IsAtRisk'] = df_projects_extended['ProjectID'].isin(at_risk_project_ids)
+    df_projects_extended['StatusIndicator'] = df_projects_extended['IsAtRisk'].apply(lambda x: '⚠️' if x else '✅')
+
+    open_risk_score = risks['open_risk_score'].set_index('ProjectID')['OpenRiskScore']
+    df_projects_extended['OpenRiskScore'] = df_projects_extended['ProjectID'].map(open_risk_score).fillna(0)
+
+    # SPI và CPI
+    df_projects_extended['SPI'] = earned_value['earned_value']['SPI'].to_numpy()
+    df_projects_extended['CPI'] = earned_value['earned_value']['CPI'].to_numpy()
+
+    # Tạo danh sách các mức ưu tiên với màu sắc tương ứng
+    priority_color_map = {'High': 'danger', 'Medium': 'warning', 'Low': 'success'}
+    df_projects_extended['PriorityColor'] = df_projects_extended['Priority'].map(priority_color_map)
+
+    # Số liệu KPI: dự án "Active" (đang làm / chưa bắt đầu và không có rủi ro cao),
+    # dự án hoàn thành và dự án "At Risk"
+    status = df_projects_extended['ProjectStatus']
+    active_projects_count = int((normalized_isin(status, ['in progress', 'not started']) &
+                                 ~df_projects_extended['ProjectID'].isin(at_risk_project_ids)).sum())
+    completed_projects_count = int(normalized_isin(status, ['completed']).sum())
+    kpis = [f"{len(df_projects_extended)}", f"{active_projects_count}", f"{completed_projects_count}", f"{len(at_risk_project_ids)}"]
+
+    return {
+        'projects_extended': df_projects_extended,
+        'projects_extended_index': build_project_position_index(df_projects_extended),
+        'kpis': pd.DataFrame([kpis], columns=KPI_COLUMNS),
+    }
+
+
+# Bảng tổng hợp cho các biểu đồ tổng quan: số dự án theo trạng thái, các dự án có
+# biến động ngân sách cao nhất / thấp nhất (BUDGET_TOP_N_OPTIONS[-1] mỗi phía) và
+# phân bố biến động theo VARIANCE_BUCKETS khoảng (một mép khoảng luôn ở 0)
+@pipeline_stage('portfolio_summary', ['projects_extended'], 'save')
+def stage_portfolio_summary(projects_extended):
+    df_projects_extended = projects_extended['projects_extended']
+
+    status_counts = df_projects_extended['ProjectStatus'].value_counts()
+    status_counts = status_counts[status_counts > 0]
+
+    top_n = BUDGET_TOP_N_OPTIONS[-1]
+    variance = df_projects_extended[['ProjectName', 'BudgetVariance']].dropna(subset=['BudgetVariance'])
+    ranked = variance.sort_values('BudgetVariance', ascending=False, kind='stable').reset_index(drop=True)
+    ranked['Rank'] = np.arange(len(ranked))
+    ranked['RankFromEnd'] = len(ranked) - 1 - ranked['Rank']
+    ranked = ranked[(ranked['Rank'] < top_n) | (ranked['RankFromEnd'] < top_n)]
+
+    values = variance['BudgetVariance'].to_numpy(dtype=float)
+    if len(values):
+        low, high = min(values.min(), 0), max(values.max(), 0)
+        width = (high - low) / VARIANCE_BUCKETS or 1
+        first = np.floor(low / width)
+        edges = (first + np.arange(int(np.ceil(high / width) - first) + 1)) * width
+        if len(edges) < 2 or edges[-1] < high:
+            edges = np.append(edges, edges[-1] + width)
+        counts, edges = np.histogram(values, bins=edges)
     else:
-        return [dash.no_update]*9
+        counts, edges = np.array([], dtype=np.int64), np.array([0.0])
+
+    return {
+        'status_counts': pd.DataFrame({'ProjectStatus': status_counts.index.astype(object),
+                                       'Count': status_counts.to_numpy()}),
+        'variance_ranked': ranked,
+        'variance_histogram': pd.DataFrame({'Start': edges[:-1], 'End': edges[1:], 'Count': counts}),
+    }
+
+
+# Số rủi ro của mỗi (dự án, ô ma trận) trong một lần duyệt mảng rủi ro. Position là
+# vị trí dự án trong projects_extended, Cell = (tác động - 1) * 3 + (xác suất - 1);
+# rủi ro thiếu mức hoặc thuộc dự án không có trong bảng dự án bị bỏ qua
+@pipeline_stage('risk_heatmap', ['risks_processed', 'projects_extended'], 'save')
+def stage_risk_heatmap(risks, projects_extended):
+    df_risks = risks['risks']
+    project_ids = projects_extended['projects_extended']['ProjectID']
+    first = np.flatnonzero(~project_ids.duplicated().to_numpy())
+    indexer = pd.Index(project_ids.to_numpy()[first]).get_indexer(df_risks['ProjectID'].to_numpy())
+
+    impact = df_risks['ImpactLevelNum'].to_numpy(dtype=float)
+    probability = df_risks['ProbabilityNum'].to_numpy(dtype=float)
+    valid = np.isin(impact, [1, 2, 3]) & np.isin(probability, [1, 2, 3]) & (indexer >= 0)
+    is_open = normalized_isin(df_risks['RiskStatus'], ['open']).to_numpy()[valid]
+
+    cells = (impact[valid].astype(np.int64) - 1) * 3 + probability[valid].astype(np.int64) - 1
+    keys, inverse = np.unique(first[indexer[valid]] * 9 + cells, return_inverse=True)
+    return {'risk_cells': pd.DataFrame({
+        'Position': (keys // 9).astype(np.int32),
+        'Cell': (keys % 9).astype(np.int8),
+        'Risks': np.bincount(inverse, minlength=len(keys)).astype(np.int32),
+        'OpenRisks': np.bincount(inverse, weights=is_open, minlength=len(keys)).astype(np.int32),
+    })}
+
+
+# Chỉ mục tìm kiếm tên dự án (xem ProjectSearchIndex)
+@pipeline_stage('project_search', ['projects_extended'], 'save')
+def stage_project_search(projects_extended):
+    return build_search_frames(projects_extended['projects_extended']['ProjectName'].tolist())
+
+
+def stage_key(name, input_keys):
+    key = '{}:{}:{}'.format(name, PROCESSING_VERSION, ':'.join(input_keys))
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+def pipeline_keys(raw_ids):
+    keys = dict(zip(SOURCE_TABLES, raw_ids))
+    for name, (inputs, _, _) in PIPELINE_STAGES.items():
+        keys[name] = stage_key(name, [keys[i] for i in inputs])
+    return keys
+
+
+# Mã dataset tổng hợp danh mục suy ra từ mã projects_extended trong Store
+def get_portfolio_summary(projects_extended_data):
+    if projects_extended_data is None:
+        return None
+    return get_dataset(stage_key('portfolio_summary', [projects_extended_data]))
+
+
+# Chạy các giai đoạn còn thiếu; trả về mã dataset cho bốn Store đã xử lý và KPI.
+# report(stage) chỉ được gọi cho giai đoạn thực sự chạy.
+def process_dataset(raw_ids, report=lambda stage: None):
+    keys = pipeline_keys(raw_ids)
+    loaded = {}
+
+    def load(name):
+        if name not in loaded:
+            loaded[name] = get_dataset(keys[name]) or run(name)
+        return loaded[name]
+
+    def run(name):
+        if name in SOURCE_TABLES:
+            return None
+        inputs, progress, func = PIPELINE_STAGES[name]
+        input_frames = [load(i) for i in inputs]
+        if any(frames is None for frames in input_frames):
+            return None
+        report(progress)
+        frames = func(*input_frames)
+        register_dataset(frames, keys[name])
+        return frames
+
+    for name in PIPELINE_STAGES:
+        if not has_dataset(keys[name]) and run(name) is None:
+            return None
+    if sqlite_store is not None:
+        # Ghi các bảng phục vụ truy vấn vào SQLite (một lần cho mỗi dataset)
+        for name in SQLITE_STAGES:
+            if not sqlite_store.has_tables(keys[name]):
+                frames = load(name)
+                if frames is None:
+                    return None
+                sqlite_store.write_dataset(keys[name], frames)
+        kpis = sqlite_store.kpis(keys['projects_extended'], keys['risks_processed'])
+        if kpis is not None:
+            return [keys['projects_extended'], keys['milestones_processed'],
+                    keys['resources_processed'], keys['risks_processed']] + kpis
+    kpis = get_frame(keys['projects_extended'], 'kpis')
+    if kpis is None:
+        return None
+    return [keys['projects_extended'], keys['milestones_processed'],
+            keys['resources_processed'], keys['risks_processed']] + kpis.iloc[0].tolist()
+
 
 # Callback để xử lý và lưu trữ dữ liệu đã xử lý
-@app.callback(
+@instrumented_callback(
     [Output('projects-extended-data', 'data'),
+     Output('milestones-processed-data', 'data'),
      Output('resources-processed-data', 'data'),
      Output('risks-processed-data', 'data'),
      Output('total-projects', 'children'),
@@ -424,192 +2225,286 @@ def load_data(n_clicks, projects_contents, projects_filename,
 )
 def process_data(projects_data, milestones_data, resources_data, risks_data):
     if projects_data and milestones_data and resources_data and risks_data:
-        # Giải mã dữ liệu
-        df_projects = pd.read_json(projects_data, orient='split')
-        df_milestones = pd.read_json(milestones_data, orient='split')
-        df_resources = pd.read_json(resources_data, orient='split')
-        df_risks = pd.read_json(risks_data, orient='split')
-
-        # Xử lý dữ liệu và tính toán
-        # Chuyển đổi các cột ngày tháng về định dạng datetime
-        date_columns = {
-            'df_projects': ['StartDate', 'EndDate', 'ExpectedEndDate'],
-            'df_milestones': ['MilestoneStartDate', 'MilestoneEndDate', 'ActualCompletionDate'],
-            'df_risks': ['DateIdentified', 'RiskReviewDate']
-        }
-
-        dfs = {'df_projects': df_projects, 'df_milestones': df_milestones, 'df_risks': df_risks}
-
-        for df_name, columns in date_columns.items():
-            df = dfs[df_name]
-            for col in columns:
-                if col in df.columns:
-                    df[col] = pd.to_datetime(df[col], errors='coerce')
-
-        # Hàm tính toán tiến độ dự án
-        def calculate_project_completion():
-            project_completion = []
-            for project_id in df_projects['ProjectID']:
-                milestones = df_milestones[df_milestones['ProjectID'] == project_id]
-                if not milestones.empty and 'PercentComplete' in milestones.columns:
-                    percent_complete = milestones['PercentComplete'].mean()
-                else:
-                    percent_complete = 0
-                project_completion.append({'ProjectID': project_id, 'PercentComplete': percent_complete})
-            df_completion = pd.DataFrame(project_completion)
-            df_projects_extended = pd.merge(df_projects, df_completion, on='ProjectID')
-            return df_projects_extended
-
-        df_projects_extended = calculate_project_completion()
-
-        # Tính toán biến động ngân sách
-        df_projects_extended['BudgetVariance'] = df_projects_extended['Budget'] - df_projects_extended['ActualCost']
-
-        # Ánh xạ mức độ tác động và xác suất thành giá trị số
-        impact_mapping = {'Low': 1, 'Medium': 2, 'High': 3}
-        probability_mapping = {'Low': 1, 'Medium': 2, 'High': 3}
-
-        df_risks['ImpactLevelNum'] = df_risks['ImpactLevel'].map(impact_mapping)
-        df_risks['ProbabilityNum'] = df_risks['Probability'].map(probability_mapping)
-        df_risks['RiskScore'] = df_risks['ImpactLevelNum'] * df_risks['ProbabilityNum']
-
-        # Xác định các rủi ro cao
-        high_risk_threshold = 6  # Bạn có thể điều chỉnh giá trị này
-        df_high_risks = df_risks[
-            (df_risks['RiskScore'] >= high_risk_threshold) &
-            (df_risks['RiskStatus'].str.strip().str.lower() == 'open')
-        ]
-
-        # Lấy danh sách các ProjectID có rủi ro cao
-        at_risk_project_ids = df_high_risks['ProjectID'].unique()
-
-        # Số lượng dự án "At Risk"
-        at_risk_projects_count = len(at_risk_project_ids)
-
-        # Tính số lượng dự án "Active"
-        active_projects = df_projects[
-            df_projects['ProjectStatus'].str.strip().str.lower().isin(['in progress', 'not started'])
-        ]
-        active_projects = active_projects[~active_projects['ProjectID'].isin(at_risk_project_ids)]
-        active_projects_count = active_projects.shape[0]
-
-        # Số lượng dự án hoàn thành
-        completed_projects_count = df_projects[df_projects['ProjectStatus'].str.strip().str.lower() == 'completed'].shape[0]
-
-        # Thêm cột 'IsAtRisk' vào df_projects_extended
-        df_projects_extended['IsAtRisk'] = df_projects_extended['ProjectID'].isin(at_risk_project_ids)
-
-        # Tính toán cột 'StatusIndicator'
-        df_projects_extended['StatusIndicator'] = df_projects_extended['IsAtRisk'].apply(lambda x: '⚠️' if x else '✅')
-
-        # Tính toán SPI và CPI
-        def calculate_spi_cpi():
-            spi_cpi_list = []
-            for project_id in df_projects_extended['ProjectID']:
-                project = df_projects_extended[df_projects_extended['ProjectID'] == project_id]
-
-                # Extract scalar values
-                percent_complete = project['PercentComplete'].values[0] / 100
-                expected_end_date = project['ExpectedEndDate'].values[0]
-                start_date = project['StartDate'].values[0]
-                end_date = project['EndDate'].values[0]
-                actual_cost = project['ActualCost'].values[0]
-                budget = project['Budget'].values[0]
-
-                # Calculate durations
-                total_duration = (expected_end_date - start_date) / np.timedelta64(1, 'D') if pd.notnull(expected_end_date) and pd.notnull(start_date) else np.nan
-                planned_duration = (end_date - start_date) / np.timedelta64(1, 'D') if pd.notnull(end_date) and pd.notnull(start_date) else np.nan
-
-                # Calculate schedule variance in days
-                schedule_variance = percent_complete * total_duration if total_duration is not np.nan else np.nan
-
-                # Calculate SPI (Schedule Performance Index)
-                if planned_duration and planned_duration > 0:
-                    spi = schedule_variance / planned_duration
-                else:
-                    spi = np.nan
-
-                # Calculate CPI (Cost Performance Index)
-                if actual_cost > 0:
-                    cpi = budget / actual_cost
-                else:
-                    cpi = np.nan
-
-                spi_cpi_list.append({'ProjectID': project_id, 'SPI': spi, 'CPI': cpi})
-
-            df_spi_cpi = pd.DataFrame(spi_cpi_list)
-            df_projects_extended2 = pd.merge(df_projects_extended, df_spi_cpi, on='ProjectID')
-            return df_projects_extended2
-
-        # Cập nhật DataFrame mở rộng với SPI và CPI
-        df_projects_extended = calculate_spi_cpi()
+        # Các giai đoạn thường đã được tính trong tác vụ nền (run_ingest_job) hoặc
+        # còn trong kho, khi đó chỉ cần đọc KPI
+        result = process_dataset([projects_data, milestones_data, resources_data, risks_data])
+        if result is not None:
+            return result
+    return [None, None, None, None, "0", "0", "0", "0"]
+
+# Sổ chi phí (tùy chọn): các dòng (Date, ProjectID, Amount) được tổng hợp một lần
+# thành chi phí theo kỳ và lũy kế theo tuần / tháng cho từng dự án. Kết quả là một
+# dataset dạng cột (Arrow) sắp theo ProjectID, Period kèm chỉ mục dự án, nên biểu đồ
+# chỉ cần cắt chuỗi của dự án đang chọn. Bổ sung dòng mới chỉ tính lại các kỳ từ kỳ
+# sớm nhất có dòng mới của những dự án bị ảnh hưởng; phần còn lại giữ nguyên.
+COST_LEDGER_TABLE = 'costs'
+COST_LEDGER_COLUMNS = ['Date', 'ProjectID', 'Amount']
+COST_ROLLUPS = {'cost_weekly': 'W-SUN', 'cost_monthly': 'M'}
+
+
+# Chỉ giữ các cột của sổ chi phí và các dòng hợp lệ; None nếu thiếu cột
+def clean_cost_ledger(df):
+    missing = [col for col in COST_LEDGER_COLUMNS if col not in df.columns]
+    if missing:
+        print(f"Sổ chi phí thiếu cột: {', '.join(missing)}")
+        return None
+    df = df[COST_LEDGER_COLUMNS].copy()
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    df['Amount'] = pd.to_numeric(df['Amount'], errors='coerce')
+    return df.dropna().reset_index(drop=True)
+
+
+def cost_period_sums(ledger, freq):
+    # Kỳ được đánh dấu bằng ngày cuối kỳ (chủ nhật / cuối tháng), khớp pd.date_range(freq='W')
+    periods = ledger['Date'].dt.to_period(freq).dt.end_time.dt.normalize()
+    return ledger.assign(Period=periods).groupby(['ProjectID', 'Period'], sort=True)['Amount'].sum().reset_index()
+
+
+def build_cost_rollup(ledger):
+    frames = {}
+    for name, freq in COST_ROLLUPS.items():
+        sums = cost_period_sums(ledger, freq)
+        sums['Cumulative'] = sums.groupby('ProjectID')['Amount'].cumsum()
+        frames[name], frames[name + '_index'] = build_project_index(sums)
+    return frames
+
+
+def append_cost_rollup(frames, ledger):
+    appended = {}
+    for name, freq in COST_ROLLUPS.items():
+        rollup = frames[name]
+        sums = cost_period_sums(ledger, freq)
+        # Với mỗi dự án có dòng mới, các kỳ trước kỳ mới sớm nhất được giữ nguyên
+        first_new = rollup['ProjectID'].map(sums.groupby('ProjectID')['Period'].min())
+        keep = first_new.isna() | (rollup['Period'] < first_new)
+        tail = pd.concat([rollup.loc[~keep, ['ProjectID', 'Period', 'Amount']], sums])
+        tail = tail.groupby(['ProjectID', 'Period'], sort=True)['Amount'].sum().reset_index()
+        # Lũy kế tiếp nối từ giá trị lũy kế cuối cùng của phần được giữ
+        base = rollup[keep & first_new.notna()].groupby('ProjectID')['Cumulative'].last()
+        tail['Cumulative'] = tail.groupby('ProjectID')['Amount'].cumsum() + tail['ProjectID'].map(base).fillna(0)
+        appended[name], appended[name + '_index'] = build_project_index(
+            pd.concat([rollup[keep], tail], ignore_index=True))
+    return appended
+
+
+# Tổng hợp sổ chi phí ledger_id (bổ sung vào dataset base_id nếu có); trả về mã dataset
+def build_cost_ledger(ledger_id, base_id=None):
+    rollup_id = stage_key('cost_ledger', [base_id, ledger_id] if base_id else [ledger_id])
+    if has_dataset(rollup_id):
+        return rollup_id
+    ledger = get_frame(ledger_id, COST_LEDGER_TABLE)
+    base = get_dataset(base_id) if base_id else None
+    if ledger is None or (base_id and base is None):
+        return None
+    frames = append_cost_rollup(base, ledger) if base is not None else build_cost_rollup(ledger)
+    register_dataset(frames, rollup_id)
+    return rollup_id
+
+
+@instrumented_callback(
+    [Output('cost-ledger-data', 'data'),
+     Output('cost-ledger-message', 'children')],
+    [Input('upload-costs', 'contents'),
+     Input('source-poll', 'n_intervals')],
+    [State('upload-costs', 'filename'),
+     State('cost-ledger-append', 'value'),
+     State('cost-ledger-data', 'data')]
+)
+def load_cost_ledger(contents, source_intervals, filename, append, cost_ledger_data):
+    if triggered_id() == 'source-poll':
+        ledger_id = data_source.cost_ledger_id if data_source else None
+        if ledger_id is None or ledger_id == cost_ledger_data:
+            return [dash.no_update, dash.no_update]
+        return [ledger_id, 'Sổ chi phí đã được cập nhật từ thư mục nguồn']
+    if contents is None:
+        return [dash.no_update, dash.no_update]
+
+    ledger_id = ingest_key(COST_LEDGER_TABLE, contents, filename)
+    if not has_dataset(ledger_id):
+        df = parse_contents(contents, filename)
+        if df is None:
+            return [dash.no_update, 'Lỗi khi đọc sổ chi phí']
+        df = clean_cost_ledger(df)
+        if df is None:
+            return [dash.no_update, f"Sổ chi phí cần các cột: {', '.join(COST_LEDGER_COLUMNS)}"]
+        register_dataset({COST_LEDGER_TABLE: apply_table_schema(COST_LEDGER_TABLE, df)}, ledger_id)
+
+    base_id = cost_ledger_data if append and cost_ledger_data else None
+    rollup_id = build_cost_ledger(ledger_id, base_id)
+    if rollup_id is None:
+        return [dash.no_update, 'Lỗi khi tổng hợp sổ chi phí']
+    return [rollup_id, f"Đã {'bổ sung' if base_id else 'tải'} sổ chi phí {filename}"]
 
-        # Xử lý dữ liệu sử dụng tài nguyên
-        if 'AllocatedHours' in df_resources.columns and 'TotalCapacity' in df_resources.columns:
-            df_resources['Utilization'] = (df_resources['AllocatedHours'] / df_resources['TotalCapacity']) * 100
-            df_resources['Utilization'] = df_resources['Utilization'].round(2)
-        else:
-            df_resources['Utilization'] = 0
+# Cập nhật tùy chọn trong bộ chọn dự án
+# Chỉ gửi tối đa SELECTOR_OPTION_LIMIT lựa chọn khớp với từ khóa đang gõ (tìm qua
+# chỉ mục tên dự án) thay vì toàn bộ danh mục; dự án đang chọn luôn có trong danh sách.
+SELECTOR_OPTION_LIMIT = 50
 
-        # Tạo danh sách các mức ưu tiên với màu sắc tương ứng
-        priority_color_map = {'High': 'danger', 'Medium': 'warning', 'Low': 'success'}
-        df_projects_extended['PriorityColor'] = df_projects_extended['Priority'].map(priority_color_map)
 
-        # Chuyển đổi DataFrame thành JSON để lưu trữ trong dcc.Store
-        projects_extended_data = df_projects_extended.to_json(date_format='iso', orient='split')
-        resources_processed_data = df_resources.to_json(date_format='iso', orient='split')
-        risks_processed_data = df_risks.to_json(date_format='iso', orient='split')
+def project_option(name, project_id):
+    # 'search' chứa cả tên không dấu để bộ lọc phía trình duyệt của Dropdown
+    # không loại bỏ các kết quả khớp khi người dùng gõ không dấu
+    label = name if pd.notnull(name) else str(project_id)
+    return {'label': label, 'value': project_id, 'search': f"{label} {normalize_search_text(label)}"}
 
-        return [projects_extended_data, resources_processed_data, risks_processed_data,
-                f"{len(df_projects)}", f"{active_projects_count}", f"{completed_projects_count}", f"{at_risk_projects_count}"]
-    else:
-        return [None, None, None, "0", "0", "0", "0"]
 
-# Cập nhật tùy chọn trong bộ chọn dự án
-@app.callback(
+@instrumented_callback(
     [Output('project-selector', 'options'),
      Output('project-selector', 'value')],
-    [Input('projects-extended-data', 'data')]
+    [Input('projects-extended-data', 'data'),
+     Input('project-selector', 'search_value')],
+    [State('project-selector', 'value')]
 )
-def update_project_selector(projects_extended_data):
+def update_project_selector(projects_extended_data, search_value, selected_project_id):
     if projects_extended_data is None:
         return [[], None]
+    df_projects_extended = get_frame(projects_extended_data, 'projects_extended')
+    if df_projects_extended is None:
+        return [[], None]
+
+    # Dữ liệu mới: chọn dự án đầu tiên; đang gõ tìm kiếm: giữ nguyên lựa chọn
+    if triggered_id() == 'project-selector':
+        value = dash.no_update
     else:
-        df_projects_extended = pd.read_json(projects_extended_data, orient='split')
-        options = [{'label': row['ProjectName'], 'value': row['ProjectID']} for _, row in df_projects_extended.iterrows()]
         value = df_projects_extended['ProjectID'].iloc[0] if not df_projects_extended.empty else None
-        return [options, value]
+        selected_project_id = value
 
-# Cập nhật chi tiết dự án
-@app.callback(
-    Output('project-details', 'children'),
+    if search_value:
+        positions = get_project_search_index(projects_extended_data).search(search_value, SELECTOR_OPTION_LIMIT)
+    else:
+        positions = np.arange(min(len(df_projects_extended), SELECTOR_OPTION_LIMIT))
+    matches = df_projects_extended.iloc[positions]
+    options = [project_option(name, project_id)
+               for name, project_id in zip(matches['ProjectName'], matches['ProjectID'].tolist())]
+
+    selected = get_project_record(projects_extended_data, selected_project_id)
+    if selected is not None and selected_project_id not in matches['ProjectID'].values:
+        options.insert(0, project_option(selected['ProjectName'], selected['ProjectID']))
+    return [options, value]
+
+# Mô hình dữ liệu của một dự án cho tab Chi tiết: bản ghi dự án, các dòng mốc /
+# tài nguyên / rủi ro và các chỉ số dẫn xuất, được tính một lần cho mỗi
+# (dự án, dataset) rồi dùng chung cho mọi thành phần của tab.
+PROJECT_VIEW_CACHE_SIZE = int(os.environ.get('DASHBOARD_PROJECT_VIEW_CACHE_SIZE', 64))
+project_view_cache = LRUCache(PROJECT_VIEW_CACHE_SIZE)
+
+
+class ProjectView:
+    def __init__(self, key, project, milestones, resources, risks, cost_weekly=None, cost_monthly=None, burndown=None):
+        self.key = key
+        self.project = project
+        self.milestones = milestones
+        self.resources = resources
+        self.risks = risks
+        # Chi phí thực tế lũy kế theo tuần / tháng (None khi chưa tải sổ chi phí)
+        self.cost_weekly = cost_weekly
+        self.cost_monthly = cost_monthly
+        # Số mốc còn lại theo tuần (giai đoạn burndown)
+        self.burndown = burndown
+
+        # Phần trăm ngân sách đã sử dụng
+        self.budget_used_percent = 0
+        if project is not None and pd.notnull(project['Budget']) and project['Budget'] != 0:
+            self.budget_used_percent = (project['ActualCost'] / project['Budget']) * 100
+
+        self.has_high_risks = risks is not None and bool((risks['RiskScore'] >= HIGH_RISK_THRESHOLD).any())
+        self.issues = []
+        if milestones is not None and 'Issues' in milestones.columns:
+            self.issues = milestones['Issues'].dropna().tolist()
+
+    # Khóa của cache_figure (json.dumps(default=str)) cho các hàm nhận ProjectView
+    def __str__(self):
+        return f'ProjectView{self.key}'
+
+
+def get_project_view(selected_project_id, projects_extended_data, milestones_processed_data, resources_processed_data, risks_processed_data,
+                     cost_ledger_data=None):
+    key = (selected_project_id, projects_extended_data, milestones_processed_data, resources_processed_data, risks_processed_data,
+           cost_ledger_data)
+
+    def rows(dataset_id, name):
+        if dataset_id is None or selected_project_id is None:
+            return None
+        return get_project_rows(dataset_id, name, selected_project_id)
+
+    # Dataset burn-down suy ra từ mã bảng mốc đã xử lý (giai đoạn burndown)
+    burndown_data = stage_key('burndown', [milestones_processed_data]) if milestones_processed_data else None
+
+    def compute():
+        project = None
+        if projects_extended_data and selected_project_id:
+            project = get_project_record(projects_extended_data, selected_project_id)
+        return ProjectView(key, project, rows(milestones_processed_data, 'milestones'),
+                           rows(resources_processed_data, 'resources'), rows(risks_processed_data, 'risks'),
+                           rows(cost_ledger_data, 'cost_weekly'), rows(cost_ledger_data, 'cost_monthly'),
+                           rows(burndown_data, 'burndown'))
+
+    return project_view_cache.get_or_compute(key, compute)
+
+
+# Cập nhật toàn bộ tab Chi tiết khi đổi dự án: một lần lấy dữ liệu (ProjectView)
+# cho cả bảy thành phần thay vì bảy callback riêng rẽ
+@instrumented_callback(
+    [Output('project-details', 'children'),
+     Output('gantt-chart', 'figure'),
+     Output('cost-over-time-chart', 'figure'),
+     Output('burndown-chart', 'figure'),
+     Output('risk-matrix', 'figure'),
+     Output('resource-utilization-chart', 'figure'),
+     Output('alerts-issues', 'children')],
     [Input('project-selector', 'value'),
-     Input('projects-extended-data', 'data')]
+     Input('projects-extended-data', 'data'),
+     Input('milestones-processed-data', 'data'),
+     Input('resources-processed-data', 'data'),
+     Input('risks-processed-data', 'data'),
+     Input('cost-ledger-data', 'data'),
+     Input('cost-over-time-chart', 'relayoutData'),
+     Input('burndown-chart', 'relayoutData')]
 )
-def update_project_details(selected_project_id, projects_extended_data):
-    if not selected_project_id or not projects_extended_data:
-        return html.Div("Vui lòng chọn một dự án để xem chi tiết.")
+def update_project_view(selected_project_id, projects_extended_data, milestones_processed_data, resources_processed_data, risks_processed_data,
+                        cost_ledger_data=None, cost_relayout=None, burndown_relayout=None):
+    view = get_project_view(selected_project_id, projects_extended_data, milestones_processed_data,
+                            resources_processed_data, risks_processed_data, cost_ledger_data)
+
+    # Phóng to / thu nhỏ biểu đồ chuỗi thời gian: chỉ vẽ lại biểu đồ đó với cửa sổ đang xem
+    triggered = triggered_props()
+    if triggered and triggered <= {'cost-over-time-chart.relayoutData', 'burndown-chart.relayoutData'}:
+        outputs = [dash.no_update] * 7
+        for position, (prop, relayout, build) in enumerate([
+                ('cost-over-time-chart.relayoutData', cost_relayout, update_cost_over_time_chart),
+                ('burndown-chart.relayoutData', burndown_relayout, update_burndown_chart)], start=2):
+            window = relayout_window(relayout) if prop in triggered else None
+            if window is not None:
+                outputs[position] = build(view, None if window == 'full' else window)
+        return outputs
+
+    return [
+        update_project_details(view),
+        update_gantt_chart(view),
+        update_cost_over_time_chart(view),
+        update_burndown_chart(view),
+        update_risk_section(view),
+        update_resource_utilization_chart(view),
+        update_alerts_issues(view),
+    ]
 
-    date_columns = ['StartDate', 'EndDate', 'ExpectedEndDate']
-    df_projects_extended = pd.read_json(projects_extended_data, orient='split', convert_dates=date_columns)
 
-    # Rest of your code remains the same
+# Cập nhật chi tiết dự án
+def update_project_details(view):
+    if not view.key[0] or not view.key[1]:
+        return html.Div("Vui lòng chọn một dự án để xem chi tiết.")
+
+    project = view.project
 
     # Kiểm tra xem dự án có tồn tại trong dữ liệu hay không
-    if selected_project_id not in df_projects_extended['ProjectID'].values:
+    if project is None:
         return html.Div("Dự án không tồn tại trong dữ liệu.")
 
-    project = df_projects_extended[df_projects_extended['ProjectID'] == selected_project_id].iloc[0]
-
     # Xử lý các giá trị NaN hoặc None
     def format_value(value):
         return value if pd.notnull(value) else 'Không có'
 
-    # Tính toán phần trăm ngân sách đã sử dụng
-    if pd.notnull(project['Budget']) and project['Budget'] != 0:
-        budget_used_percent = (project['ActualCost'] / project['Budget']) * 100
-    else:
-        budget_used_percent = 0
+    budget_used_percent = view.budget_used_percent
 
     details = [
         dbc.Accordion([
@@ -659,27 +2554,13 @@ def update_project_details(selected_project_id, projects_extended_data):
 # Các callback khác cập nhật biểu đồ, bảng, và các thành phần khác
 # (Các hàm này giữ nguyên như trong mã của bạn)
 # Cập nhật biểu đồ Gantt
-@app.callback(
-    Output('gantt-chart', 'figure'),
-    [Input('project-selector', 'value'),
-     Input('milestones-data', 'data')]
-)
-def update_gantt_chart(selected_project_id, milestones_data):
-    if not milestones_data or not selected_project_id:
-        return go.Figure()  # Return an empty figure
-
-    # Convert JSON data to DataFrame
-    df_milestones = pd.read_json(milestones_data, orient='split')
-    selected_milestones = df_milestones[df_milestones['ProjectID'] == selected_project_id].copy()
-
-    if selected_milestones.empty:
+@cache_figure('gantt')
+def update_gantt_chart(view):
+    # Milestones in the registry already have datetime columns (parsed in process_data)
+    selected_milestones = view.milestones
+    if selected_milestones is None or selected_milestones.empty:
         return go.Figure()
-
-    # Convert relevant columns to datetime
-    date_columns = ['MilestoneStartDate', 'MilestoneEndDate', 'ActualCompletionDate']
-    for col in date_columns:
-        if col in selected_milestones.columns:
-            selected_milestones[col] = pd.to_datetime(selected_milestones[col], errors='coerce')
+    selected_milestones = selected_milestones.copy()
 
     # Drop rows with missing start or end dates
     selected_milestones.dropna(subset=['MilestoneStartDate', 'MilestoneEndDate'], inplace=True)
@@ -717,6 +2598,10 @@ def update_gantt_chart(selected_project_id, milestones_data):
         },
         template='plotly'  # Changed from 'plotly_white' to 'plotly'
     )
+    # Với pandas 2, px.timeline để độ dài thanh ở dạng timedelta (không mã hóa JSON
+    # được); plotly cần số mili giây trên trục ngày
+    fig.for_each_trace(lambda trace: trace.update(
+        x=[d.total_seconds() * 1000 if hasattr(d, 'total_seconds') else d for d in trace.x]))
 
     # Customize hovertemplate for better control over hover information
     fig.update_traces(
@@ -744,38 +2629,97 @@ def update_gantt_chart(selected_project_id, milestones_data):
     )
 
     return fig
-# Cập nhật biểu đồ chi phí theo thời gian
-@app.callback(
-    Output('cost-over-time-chart', 'figure'),
-    [Input('project-selector', 'value'),
-     Input('projects-data', 'data')]
-)
-def update_cost_over_time_chart(selected_project_id, projects_data):
-    # Nội dung hàm như trong code trước
 
-    if projects_data is None or selected_project_id is None:
-        return go.Figure()
-    df_projects = pd.read_json(projects_data, orient='split')
-    project = df_projects[df_projects['ProjectID'] == selected_project_id].iloc[0]
 
-    start_date = project['StartDate']
-    end_date = project['ExpectedEndDate']
-    if pd.isnull(start_date) or pd.isnull(end_date):
+# Biểu đồ chuỗi thời gian (chi phí, burn-down): dùng trace WebGL (Scattergl) và giảm
+# mẫu bằng LTTB xuống TIMESERIES_POINT_BUDGET điểm, giữ hình dạng đường (đỉnh, đáy).
+# Chuỗi đầy đủ được tính sẵn trong kho (sổ chi phí, giai đoạn burndown); khi phóng
+# to, relayoutData của biểu đồ gửi cửa sổ đang xem và chỉ đoạn đó được giảm mẫu lại
+# với độ phân giải đầy đủ.
+TIMESERIES_POINT_BUDGET = int(os.environ.get('DASHBOARD_TIMESERIES_POINTS', 1000))
+
+
+# Largest-Triangle-Three-Buckets: chọn threshold vị trí (luôn gồm điểm đầu và cuối)
+def lttb_indices(x, y, threshold):
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    every = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    selected = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        next_end = min(int((bucket + 2) * every) + 1, n)
+        # Đỉnh thứ ba của tam giác: trung bình khoảng kế tiếp (hoặc điểm cuối)
+        if end < next_end:
+            next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        else:
+            next_x, next_y = x[n - 1], y[n - 1]
+        area = np.abs((x[selected] - next_x) * (y[start:end] - y[selected])
+                      - (x[selected] - x[start:end]) * (next_y - y[selected]))
+        selected = start + int(np.argmax(area))
+        indices[bucket + 1] = selected
+    return indices
+
+
+# Cửa sổ trục x từ relayoutData: (bắt đầu, kết thúc), 'full' khi trở về toàn cảnh,
+# None khi thay đổi không liên quan tới trục x
+def relayout_window(relayout_data):
+    if not relayout_data:
+        return None
+    if relayout_data.get('xaxis.autorange'):
+        return 'full'
+    if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
+        bounds = relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+    elif 'xaxis.range' in relayout_data:
+        bounds = relayout_data['xaxis.range']
+    else:
+        return None
+    try:
+        return pd.Timestamp(bounds[0]), pd.Timestamp(bounds[1])
+    except (TypeError, ValueError):
+        return None
+
+
+def timeseries_trace(dates, values, window=None, **trace_args):
+    dates = pd.DatetimeIndex(dates)
+    values = np.asarray(values, dtype=float)
+    if window is not None:
+        # Thêm một điểm mỗi bên để đường kéo dài tới mép cửa sổ
+        lo = max(dates.searchsorted(window[0], side='left') - 1, 0)
+        hi = min(dates.searchsorted(window[1], side='right') + 1, len(dates))
+        dates, values = dates[lo:hi], values[lo:hi]
+    positions = lttb_indices(dates.asi8.astype(float), values, TIMESERIES_POINT_BUDGET)
+    return go.Scattergl(x=dates[positions], y=values[positions], **trace_args)
+
+
+# Cập nhật biểu đồ chi phí theo thời gian: chi phí kế hoạch phân bổ đều từ ngày bắt
+# đầu tới ngày kết thúc dự kiến, chi phí thực tế lũy kế lấy từ sổ chi phí đã tổng
+# hợp theo tuần (theo tháng khi chuỗi tuần vượt TIMESERIES_POINT_BUDGET điểm)
+@cache_figure('cost-over-time')
+def update_cost_over_time_chart(view, window=None):
+    project = view.project
+    if project is None:
         return go.Figure()
-    dates = pd.date_range(start=start_date, end=end_date, freq='W')
-    planned_cost = np.linspace(0, project['Budget'], len(dates))
-    actual_cost = np.cumsum(np.random.uniform(0, project['Budget']/len(dates), len(dates)))
-
-    df_cost = pd.DataFrame({
-        'Date': dates,
-        'Planned Cost': planned_cost,
-        'Actual Cost': actual_cost
-    })
 
     fig = go.Figure()
-    fig.add_trace(go.Scatter(x=df_cost['Date'], y=df_cost['Planned Cost'], mode='lines', name='Chi phí Kế hoạch'))
-    fig.add_trace(go.Scatter(x=df_cost['Date'], y=df_cost['Actual Cost'], mode='lines', name='Chi phí Thực tế'))
-
+    start_date = project['StartDate']
+    end_date = project['ExpectedEndDate']
+    if pd.notnull(start_date) and pd.notnull(end_date):
+        dates = pd.date_range(start=start_date, end=end_date, freq='W')
+        planned_cost = np.linspace(0, project['Budget'], len(dates))
+        fig.add_trace(timeseries_trace(dates, planned_cost, window, mode='lines', name='Chi phí Kế hoạch'))
+
+    actual = view.cost_weekly
+    if actual is not None and window is None and len(actual) > TIMESERIES_POINT_BUDGET:
+        actual = view.cost_monthly
+    if actual is not None and not actual.empty:
+        fig.add_trace(timeseries_trace(actual['Period'], actual['Cumulative'], window, mode='lines', name='Chi phí Thực tế'))
+
+    if not fig.data:
+        return fig
     fig.update_layout(
         template='plotly_white',
         margin=dict(l=20, r=20, t=50, b=20),
@@ -783,41 +2727,25 @@ def update_cost_over_time_chart(selected_project_id, projects_data):
         hoverlabel=dict(bgcolor="white", font_size=12),
         xaxis_title='Ngày',
         yaxis_title='Chi phí',
+        uirevision=str(view),
     )
+    if window is not None:
+        fig.update_xaxes(range=list(window))
 
     return fig
 
 # Cập nhật biểu đồ Burn-down
-@app.callback(
-    Output('burndown-chart', 'figure'),
-    [Input('project-selector', 'value'),
-     Input('milestones-data', 'data')]
-)
-def update_burndown_chart(selected_project_id, milestones_data):
-    # Nội dung hàm như trong code trước
-
-    if milestones_data is None or selected_project_id is None:
-        return go.Figure()
-    df_milestones = pd.read_json(milestones_data, orient='split')
-    selected_milestones = df_milestones[df_milestones['ProjectID'] == selected_project_id]
-    if selected_milestones.empty:
-        return go.Figure()
-    total_tasks = len(selected_milestones)
-    start_date = selected_milestones['MilestoneStartDate'].min()
-    end_date = selected_milestones['MilestoneEndDate'].max()
-    if pd.isnull(start_date) or pd.isnull(end_date):
+@cache_figure('burndown')
+def update_burndown_chart(view, window=None):
+    df_burndown = view.burndown
+    if df_burndown is None or df_burndown.empty:
         return go.Figure()
-    dates = pd.date_range(start=start_date, end=end_date, freq='W')
-    remaining_tasks = total_tasks - np.cumsum(np.random.randint(0, 2, len(dates)))
-    remaining_tasks = np.maximum(remaining_tasks, 0)  # Đảm bảo không có giá trị âm
-
-    df_burndown = pd.DataFrame({
-        'Date': dates,
-        'Remaining Tasks': remaining_tasks
-    })
 
     fig = go.Figure()
-    fig.add_trace(go.Scatter(x=df_burndown['Date'], y=df_burndown['Remaining Tasks'], mode='lines+markers', name='Nhiệm vụ Còn lại'))
+    fig.add_trace(timeseries_trace(df_burndown['Date'], df_burndown['Planned'], window,
+                                   mode='lines', name='Kế hoạch', line=dict(dash='dash')))
+    fig.add_trace(timeseries_trace(df_burndown['Date'], df_burndown['Remaining'], window,
+                                   mode='lines+markers', name='Nhiệm vụ Còn lại'))
 
     fig.update_layout(
         template='plotly_white',
@@ -826,27 +2754,22 @@ def update_burndown_chart(selected_project_id, milestones_data):
         hoverlabel=dict(bgcolor="white", font_size=12),
         xaxis_title='Ngày',
         yaxis_title='Nhiệm vụ Còn lại',
+        uirevision=str(view),
     )
+    if window is not None:
+        fig.update_xaxes(range=list(window))
 
     return fig
 
 # Cập nhật phân tích rủi ro
-@app.callback(
-    [Output('risk-matrix', 'figure'),
-     Output('risk-table', 'children')],
-    [Input('project-selector', 'value'),
-     Input('risks-processed-data', 'data')]
-)
-def update_risk_section(selected_project_id, risks_processed_data):
+@cache_figure('risk-section')
+def update_risk_section(view):
     # Nội dung hàm như trong code trước
 
-    if risks_processed_data is None or selected_project_id is None:
-        return go.Figure(), html.P("Không có rủi ro liên quan đến dự án này.")
-    df_risks = pd.read_json(risks_processed_data, orient='split')
-    selected_risks = df_risks[df_risks['ProjectID'] == selected_project_id]
+    selected_risks = view.risks
 
-    if selected_risks.empty:
-        return go.Figure(), html.P("Không có rủi ro liên quan đến dự án này.")
+    if selected_risks is None or selected_risks.empty:
+        return go.Figure()
 
     fig = px.scatter(
         selected_risks,
@@ -877,36 +2800,126 @@ def update_risk_section(selected_project_id, risks_processed_data):
         hoverlabel=dict(bgcolor="white", font_size=12),
     )
 
-    risk_table = dash_table.DataTable(
-        columns=[{"name": i, "id": i} for i in ['RiskID', 'RiskDescription', 'ImpactLevel', 'Probability', 'RiskScore', 'RiskStatus', 'RiskOwner', 'RiskTrigger', 'ContingencyPlan', 'ResidualRisk']],
-        data=selected_risks.to_dict('records'),
-        style_cell={'textAlign': 'left', 'padding': '5px'},
-        style_header={
-            'backgroundColor': '#f9f9f9',
-            'fontWeight': 'bold',
-            'border': '1px solid #e0e0e0',
-        },
-        style_data={
-            'border': '1px solid #e0e0e0',
-        },
-        style_table={'overflowX': 'auto'},
-    )
+    return fig
 
-    return fig, risk_table
+# Bảng chi tiết rủi ro (chế độ custom của DataTable)
+# Thứ tự sắp xếp của từng dự án được lưu lại theo (dataset, dự án, sort_by) nên
+# chuyển trang hoặc đổi bộ lọc không phải sắp xếp lại.
+risk_sort_cache = LRUCache(256)
 
-# Cập nhật biểu đồ sử dụng tài nguyên
-@app.callback(
-    Output('resource-utilization-chart', 'figure'),
+# Toán tử của cú pháp filter_query ("{RiskScore} ge 6", "{RiskScore} >= 6",
+# "{RiskDescription} contains abc"): tên chuẩn và các ký hiệu tương đương
+RISK_FILTER_OPERATORS = [
+    ('ge', '>='), ('le', '<='), ('lt', '<'), ('gt', '>'), ('ne', '!='), ('eq', '='),
+    ('contains',), ('datestartswith',),
+]
+RISK_FILTER_OPERATOR_NAMES = {token: operator_type[0] for operator_type in RISK_FILTER_OPERATORS for token in operator_type}
+# Toán tử là từ đầu tiên ngay sau dấu } đóng tên cột, phần còn lại là giá trị
+RISK_FILTER_PART = re.compile(r'^\s*\{(?P<name>[^}]*)\}\s*(?P<operator>[A-Za-z]+|[<>!=]+)(?:\s*(?P<value>.*?))?\s*$', re.DOTALL)
+
+
+def split_filter_part(filter_part):
+    match = RISK_FILTER_PART.match(filter_part)
+    if match is None or match.group('operator') not in RISK_FILTER_OPERATOR_NAMES:
+        return None, None, None
+    value_part = match.group('value') or ''
+    if len(value_part) > 1 and value_part[0] == value_part[-1] and value_part[0] in ('"', "'", '`'):
+        value = value_part[1:-1].replace('\\' + value_part[0], value_part[0])
+    else:
+        try:
+            value = float(value_part)
+        except ValueError:
+            value = value_part
+    return match.group('name'), RISK_FILTER_OPERATOR_NAMES[match.group('operator')], value
+
+
+def risk_filter_mask(df, filter_query):
+    mask = np.ones(len(df), dtype=bool)
+    for filter_part in (filter_query or '').split(' && '):
+        column, operator, value = split_filter_part(filter_part)
+        if column not in RISK_TABLE_COLUMNS:
+            continue
+        series = df[column]
+        if operator in ('eq', 'ne', 'lt', 'le', 'gt', 'ge'):
+            if isinstance(value, float):
+                series = pd.to_numeric(series, errors='coerce')
+            else:
+                series = series.astype(str)
+            comparison = {
+                'eq': series.eq, 'ne': series.ne, 'lt': series.lt,
+                'le': series.le, 'gt': series.gt, 'ge': series.ge,
+            }[operator](value)
+            mask &= comparison.fillna(False).to_numpy(dtype=bool)
+        elif operator == 'contains':
+            mask &= series.astype(str).str.contains(str(value), case=False, regex=False).to_numpy(dtype=bool)
+        elif operator == 'datestartswith':
+            mask &= series.astype(str).str.startswith(str(value)).to_numpy(dtype=bool)
+    return mask
+
+
+def risk_sort_order(dataset_id, project_id, df, sort_by):
+    sort_by = [s for s in (sort_by or []) if s.get('column_id') in RISK_TABLE_COLUMNS]
+    if not sort_by:
+        return np.arange(len(df))
+    key = (dataset_id, project_id, tuple((s['column_id'], s['direction']) for s in sort_by))
+
+    def compute():
+        # Sắp xếp ổn định theo từng cột, từ cột ưu tiên thấp nhất tới cao nhất
+        order = np.arange(len(df))
+        for s in reversed(sort_by):
+            column = df[s['column_id']].iloc[order].reset_index(drop=True)
+            positions = column.sort_values(ascending=s['direction'] != 'desc', kind='stable', na_position='last').index
+            order = order[positions.to_numpy()]
+        return order
+
+    return risk_sort_cache.get_or_compute(key, compute)
+
+
+@instrumented_callback(
+    [Output('risk-table', 'data'),
+     Output('risk-table', 'page_count'),
+     Output('risk-table', 'page_current'),
+     Output('risk-table-message', 'children')],
     [Input('project-selector', 'value'),
-     Input('resources-processed-data', 'data')]
+     Input('risks-processed-data', 'data'),
+     Input('risk-table', 'page_current'),
+     Input('risk-table', 'page_size'),
+     Input('risk-table', 'sort_by'),
+     Input('risk-table', 'filter_query'),
+     Input('risk-table', 'hidden_columns')]
 )
-def update_resource_utilization_chart(selected_project_id, resources_processed_data):
-    if resources_processed_data is None or selected_project_id is None:
-        return go.Figure()
-    df_resources = pd.read_json(resources_processed_data, orient='split')
-    selected_resources = df_resources[df_resources['ProjectID'] == selected_project_id]
+def update_risk_table(selected_project_id, risks_processed_data, page_current, page_size, sort_by, filter_query, hidden_columns):
+    empty_message = html.P("Không có rủi ro liên quan đến dự án này.")
+    if risks_processed_data is None or selected_project_id is None:
+        return [[], 0, 0, empty_message]
+    # Bảng chỉ hiển thị, lọc và sắp xếp theo RISK_TABLE_COLUMNS
+    selected_risks = get_project_rows(risks_processed_data, 'risks', selected_project_id, RISK_TABLE_COLUMNS)
+    if selected_risks is None or selected_risks.empty:
+        return [[], 0, 0, empty_message]
+
+    # Đổi dự án, dữ liệu, sắp xếp hoặc bộ lọc thì quay về trang đầu
+    triggered = triggered_props()
+    if page_current is None or (triggered and 'risk-table.page_current' not in triggered):
+        page_current = 0
+    page_size = page_size or RISK_TABLE_PAGE_SIZE
+
+    order = risk_sort_order(risks_processed_data, selected_project_id, selected_risks, sort_by)
+    if filter_query:
+        order = order[risk_filter_mask(selected_risks, filter_query)[order]]
+    page_count = max(1, -(-len(order) // page_size))
+    page_current = min(page_current, page_count - 1)
+
+    columns = [c for c in RISK_TABLE_COLUMNS if c not in (hidden_columns or [])]
+    page = selected_risks.iloc[order[page_current * page_size:(page_current + 1) * page_size]][columns]
+    message = None if len(order) else html.P("Không có rủi ro nào khớp với bộ lọc.")
+    return [page.to_dict('records'), page_count, page_current, message]
 
-    if selected_resources.empty:
+# Cập nhật biểu đồ sử dụng tài nguyên
+@cache_figure('resource-utilization')
+def update_resource_utilization_chart(view):
+    selected_resources = view.resources
+
+    if selected_resources is None or selected_resources.empty:
         return go.Figure()
 
     # Remove or modify the 'template' parameter
@@ -932,24 +2945,13 @@ def update_resource_utilization_chart(selected_project_id, resources_processed_d
 
 
 # Cập nhật cảnh báo và vấn đề
-@app.callback(
-    Output('alerts-issues', 'children'),
-    [Input('project-selector', 'value'),
-     Input('projects-extended-data', 'data'),
-     Input('risks-processed-data', 'data'),
-     Input('milestones-data', 'data')]
-)
-def update_alerts_issues(selected_project_id, projects_extended_data, risks_processed_data, milestones_data):
+def update_alerts_issues(view):
     # Nội dung hàm như trong code trước
 
-    if projects_extended_data is None or selected_project_id is None:
+    project = view.project
+    if project is None or view.risks is None or view.milestones is None:
         return html.Div()
-    df_projects_extended = pd.read_json(projects_extended_data, orient='split')
-    df_risks = pd.read_json(risks_processed_data, orient='split')
-    df_milestones = pd.read_json(milestones_data, orient='split')
 
-    # Lấy dữ liệu dự án
-    project = df_projects_extended[df_projects_extended['ProjectID'] == selected_project_id].iloc[0]
     alerts = []
     if pd.notnull(project['ExpectedEndDate']) and pd.notnull(project['EndDate']):
         if project['ExpectedEndDate'] > project['EndDate']:
@@ -959,19 +2961,14 @@ def update_alerts_issues(selected_project_id, projects_extended_data, risks_proc
         alerts.append(dbc.Alert("Dự án vượt quá ngân sách.", color='danger'))
 
     # Kiểm tra các vấn đề rủi ro cao
-    selected_risks = df_risks[df_risks['ProjectID'] == selected_project_id]
-    high_risks = selected_risks[selected_risks['RiskScore'] >= 6]
-    if not high_risks.empty:
+    if view.has_high_risks:
         alerts.append(dbc.Alert("Phát hiện các vấn đề rủi ro cao.", color='danger'))
 
     # Hiển thị các vấn đề từ mốc
-    selected_milestones = df_milestones[df_milestones['ProjectID'] == selected_project_id]
-    if 'Issues' in selected_milestones.columns:
-        issues = selected_milestones['Issues'].dropna()
-        if not issues.empty:
-            alerts.append(dbc.Alert("Các vấn đề được báo cáo trong các mốc:", color='warning'))
-            for issue in issues:
-                alerts.append(html.P(f"- {issue}", style={'marginLeft': '20px'}))
+    if view.issues:
+        alerts.append(dbc.Alert("Các vấn đề được báo cáo trong các mốc:", color='warning'))
+        for issue in view.issues:
+            alerts.append(html.P(f"- {issue}", style={'marginLeft': '20px'}))
 
     if not alerts:
         alerts.append(dbc.Alert("Không có cảnh báo. Dự án đang theo đúng tiến độ.", color='success'))
@@ -979,17 +2976,18 @@ def update_alerts_issues(selected_project_id, projects_extended_data, risks_proc
     return alerts
 
 # Cập nhật biểu đồ phân bố trạng thái dự án
-@app.callback(
+@instrumented_callback(
     Output('status-distribution-chart', 'figure'),
     [Input('projects-extended-data', 'data')]
 )
+@cache_figure('status-distribution')
 def update_status_distribution_chart(projects_extended_data):
     # Nội dung hàm như trong code trước
 
-    if projects_extended_data is None:
+    summary = get_portfolio_summary(projects_extended_data)
+    if summary is None:
         return go.Figure()
-    df_projects_extended = pd.read_json(projects_extended_data, orient='split')
-    status_counts = df_projects_extended['ProjectStatus'].value_counts()
+    status_counts = summary['status_counts']
     if len(status_counts) == 0:
         fig = go.Figure()
         fig.add_annotation(text="Không có dữ liệu trạng thái dự án",
@@ -998,8 +2996,8 @@ def update_status_distribution_chart(projects_extended_data):
         return fig
     else:
         fig = px.pie(
-            names=status_counts.index,
-            values=status_counts.values,
+            names=status_counts['ProjectStatus'],
+            values=status_counts['Count'],
             hole=0.4,
             color_discrete_sequence=px.colors.qualitative.Pastel,
         )
@@ -1012,25 +3010,53 @@ def update_status_distribution_chart(projects_extended_data):
         return fig
 
 # Cập nhật biểu đồ biến động ngân sách
-@app.callback(
+# Chế độ 'top': top_n dự án biến động cao nhất và thấp nhất; chế độ 'histogram':
+# số dự án theo khoảng biến động. Cả hai chỉ đọc bảng tổng hợp nên chi phí không
+# phụ thuộc số dự án.
+@instrumented_callback(
     Output('budget-variance-chart', 'figure'),
-    [Input('projects-extended-data', 'data')]
+    [Input('projects-extended-data', 'data'),
+     Input('budget-variance-mode', 'value'),
+     Input('budget-variance-top-n', 'value')]
 )
-def update_budget_variance_chart(projects_extended_data):
-    # Nội dung hàm như trong code trước
-
-    if projects_extended_data is None:
+@cache_figure('budget-variance')
+def update_budget_variance_chart(projects_extended_data, mode='top', top_n=BUDGET_TOP_N_OPTIONS[0]):
+    summary = get_portfolio_summary(projects_extended_data)
+    if summary is None:
         return go.Figure()
-    df_projects_extended = pd.read_json(projects_extended_data, orient='split')
-    budget_variance = df_projects_extended['BudgetVariance']
-    project_names = df_projects_extended['ProjectName']
-    colors = ['#28a745' if val >= 0 else '#dc3545' for val in budget_variance]
+
+    if mode == 'histogram':
+        buckets = summary['variance_histogram']
+        starts = buckets['Start'].to_numpy()
+        ends = buckets['End'].to_numpy()
+        fig = go.Figure(go.Bar(
+            x=(starts + ends) / 2,
+            y=buckets['Count'],
+            width=ends - starts,
+            marker_color=np.where(starts >= 0, '#28a745', '#dc3545'),
+            customdata=np.column_stack([starts, ends]),
+            hovertemplate='%{customdata[0]:,.0f} – %{customdata[1]:,.0f} VND<br>%{y} dự án<extra></extra>',
+        ))
+        fig.update_layout(
+            template='plotly_white',
+            bargap=0.05,
+            margin=dict(l=20, r=20, t=50, b=20),
+            xaxis_title='Biến động Ngân sách (VND)',
+            yaxis_title='Số dự án',
+            hoverlabel=dict(bgcolor="white", font_size=12),
+        )
+        return fig
+
+    ranked = summary['variance_ranked']
+    top_n = top_n or BUDGET_TOP_N_OPTIONS[0]
+    ranked = ranked[(ranked['Rank'] < top_n) | (ranked['RankFromEnd'] < top_n)]
+    budget_variance = ranked['BudgetVariance']
 
     fig = go.Figure(go.Bar(
-        x=project_names,
+        x=ranked['ProjectName'],
         y=budget_variance,
-        marker_color=colors,
-        text=[f"{val:,} VND" for val in budget_variance],
+        marker_color=np.where(budget_variance >= 0, '#28a745', '#dc3545'),
+        text=[f"{val:,} VND" for val in budget_variance.tolist()],
         textposition='outside',
     ))
 
@@ -1044,44 +3070,255 @@ def update_budget_variance_chart(projects_extended_data):
     )
     return fig
 
-# Cập nhật thanh tiến trình dự án
-@app.callback(
-    Output('project-progress-bars', 'children'),
-    [Input('risk-filter', 'value'),
-     Input('project-search', 'value'),
-     Input('projects-extended-data', 'data')]
-)
-def update_project_progress_bars(risk_filter, search_value, projects_extended_data):
-    # Nội dung hàm như trong code trước
+# Ma trận rủi ro danh mục: các dòng (dự án, ô) của giai đoạn risk_heatmap được lọc
+# theo cùng bộ lọc rủi ro / tìm kiếm của danh sách tiến độ rồi cộng dồn theo ô bằng
+# bincount. Kết quả lọc được lưu đệm theo (dataset, bộ lọc) cho cả biểu đồ và bảng
+# dự án của ô được chọn.
+risk_heatmap_cache = LRUCache(64)
+
+
+def risk_heatmap_cells(risk_filter, search_value, scope, projects_extended_data, risks_processed_data):
+    if projects_extended_data is None or risks_processed_data is None:
+        return None
+
+    def compute():
+        df_projects_extended = get_frame(projects_extended_data, 'projects_extended')
+        df_cells = get_frame(stage_key('risk_heatmap', [risks_processed_data, projects_extended_data]), 'risk_cells')
+        if df_projects_extended is None or df_cells is None:
+            return None
+        search_positions = None
+        if search_value:
+            search_positions = get_project_search_index(projects_extended_data).search(search_value)
+        mask = np.zeros(len(df_projects_extended), dtype=bool)
+        mask[filter_project_positions(df_projects_extended, risk_filter, search_positions, 'default')] = True
+
+        positions = df_cells['Position'].to_numpy()
+        counts = df_cells['OpenRisks' if scope == 'open' else 'Risks'].to_numpy()
+        keep = mask[positions] & (counts > 0)
+        return pd.DataFrame({'Position': positions[keep], 'Cell': df_cells['Cell'].to_numpy()[keep], 'Count': counts[keep]})
+
+    key = (projects_extended_data, risks_processed_data, risk_filter, normalize_search_text(search_value or ''), scope)
+    return risk_heatmap_cache.get_or_compute(key, compute)
+
+
+RISK_HEATMAP_INPUTS = [
+    Input('risk-filter', 'value'),
+    Input('project-search', 'value'),
+    Input('risk-heatmap-scope', 'value'),
+    Input('projects-extended-data', 'data'),
+    Input('risks-processed-data', 'data'),
+]
+
+
+@instrumented_callback(Output('portfolio-risk-heatmap', 'figure'), RISK_HEATMAP_INPUTS)
+@cache_figure('portfolio-risk-heatmap')
+def update_portfolio_risk_heatmap(risk_filter, search_value, scope, projects_extended_data, risks_processed_data):
+    df_cells = risk_heatmap_cells(risk_filter, search_value, scope, projects_extended_data, risks_processed_data)
+    if df_cells is None:
+        return go.Figure()
+
+    # Giá trị chịu rủi ro của ô: tổng ngân sách các dự án có rủi ro trong ô
+    budget = pd.to_numeric(get_frame(projects_extended_data, 'projects_extended')['Budget'], errors='coerce')
+    budget = budget.fillna(0).to_numpy(dtype=float)
+    cells = df_cells['Cell'].to_numpy()
+    risk_counts = np.bincount(cells, weights=df_cells['Count'].to_numpy(), minlength=9).astype(np.int64).reshape(3, 3)
+    project_counts = np.bincount(cells, minlength=9).reshape(3, 3)
+    exposure = np.bincount(cells, weights=budget[df_cells['Position'].to_numpy()], minlength=9).reshape(3, 3)
+
+    fig = go.Figure(go.Heatmap(
+        z=risk_counts,
+        x=RISK_LEVEL_LABELS,
+        y=RISK_LEVEL_LABELS,
+        text=[[f"{risks:,} rủi ro<br>{projects:,} dự án" for risks, projects in zip(*row)]
+              for row in zip(risk_counts.tolist(), project_counts.tolist())],
+        texttemplate='%{text}',
+        customdata=np.dstack([project_counts, exposure]),
+        colorscale='YlOrRd',
+        hovertemplate=('Tác động %{y}, xác suất %{x}<br>%{z:,} rủi ro trong %{customdata[0]:,} dự án<br>'
+                       'Ngân sách chịu rủi ro: %{customdata[1]:,.0f} VND<extra></extra>'),
+    ))
+    fig.update_layout(
+        template='plotly_white',
+        xaxis_title='Xác suất',
+        yaxis_title='Tác động',
+        margin=dict(l=20, r=20, t=20, b=20),
+        hoverlabel=dict(bgcolor="white", font_size=12),
+    )
+    return fig
 
-    if projects_extended_data is None:
-        return html.Div()
-    df_projects_extended = pd.read_json(projects_extended_data, orient='split')
 
-    filtered_df = df_projects_extended.copy()
+# Danh sách dự án của ô được bấm: nhiều rủi ro trong ô nhất trước
+@instrumented_callback(Output('risk-heatmap-projects', 'children'),
+                       [Input('portfolio-risk-heatmap', 'clickData')] + RISK_HEATMAP_INPUTS)
+def update_risk_heatmap_projects(click_data, risk_filter, search_value, scope, projects_extended_data, risks_processed_data):
+    df_cells = risk_heatmap_cells(risk_filter, search_value, scope, projects_extended_data, risks_processed_data)
+    point = (click_data or {}).get('points', [{}])[0]
+    if df_cells is None or point.get('x') not in RISK_LEVEL_LABELS or point.get('y') not in RISK_LEVEL_LABELS:
+        return html.P("Chọn một ô của ma trận để xem các dự án.", className='text-muted')
+
+    cell = RISK_LEVEL_LABELS.index(point['y']) * 3 + RISK_LEVEL_LABELS.index(point['x'])
+    selected = df_cells[df_cells['Cell'].to_numpy() == cell]
+    project_counts = len(selected)
+    title = html.H6(f"Tác động {point['y']}, xác suất {point['x']}: {project_counts:,} dự án")
+    if selected.empty:
+        return [title, html.P("Không có rủi ro nào trong ô này.", className='text-muted')]
+
+    order = np.lexsort((selected['Position'].to_numpy(), -selected['Count'].to_numpy()))[:RISK_HEATMAP_PROJECT_LIMIT]
+    selected = selected.iloc[order]
+    projects = get_frame(projects_extended_data, 'projects_extended').iloc[selected['Position'].to_numpy()]
+    rows = [
+        html.Tr([html.Td(f"{project.StatusIndicator} {project.ProjectName}"), html.Td(project.ProjectStatus),
+                 html.Td(f"{count:,}"), html.Td(f"{project.Budget:,.0f}")])
+        for project, count in zip(projects.itertuples(index=False), selected['Count'].tolist())
+    ]
+    table = dbc.Table([
+        html.Thead(html.Tr([html.Th('Dự án'), html.Th('Trạng thái'), html.Th('Số rủi ro'), html.Th('Ngân sách (VND)')])),
+        html.Tbody(rows),
+    ], bordered=False, hover=True, size='sm')
+    children = [title, table]
+    remaining = project_counts - len(rows)
+    if remaining > 0:
+        children.append(html.P(f"… và {remaining:,} dự án khác", className='text-muted'))
+    return children
+
+# Cập nhật thanh tiến trình dự án
+# Chỉ trang đang xem được dựng thành component; danh sách vị trí dòng sau khi
+# lọc và sắp xếp được lưu đệm theo (dataset, bộ lọc, từ khóa, cách sắp xếp)
+# nên chuyển trang không phải lọc lại.
+PROGRESS_PAGE_SIZE = int(os.environ.get('DASHBOARD_PROGRESS_PAGE_SIZE', 20))
+# Lọc/sắp xếp/vẽ danh sách tiến độ trên trình duyệt (assets/progress.js) thay vì
+# gọi update_project_progress_bars trên server mỗi lần đổi bộ lọc
+CLIENTSIDE_FILTERING = os.environ.get('DASHBOARD_CLIENTSIDE_FILTERING', '0') == '1'
+progress_filter_cache = LRUCache(64)
+
+
+def filter_project_positions(df_projects_extended, risk_filter, search_positions, sort_by):
+    mask = np.ones(len(df_projects_extended), dtype=bool)
     if risk_filter == 'at_risk':
-        filtered_df = filtered_df[filtered_df['IsAtRisk']]
+        mask &= df_projects_extended['IsAtRisk'].to_numpy(dtype=bool)
     elif risk_filter == 'not_at_risk':
-        filtered_df = filtered_df[~filtered_df['IsAtRisk']]
-    if search_value:
-        filtered_df = filtered_df[filtered_df['ProjectName'].str.contains(search_value, case=False)]
+        mask &= ~df_projects_extended['IsAtRisk'].to_numpy(dtype=bool)
+    if search_positions is not None:
+        search_mask = np.zeros(len(df_projects_extended), dtype=bool)
+        search_mask[search_positions] = True
+        mask &= search_mask
+    positions = np.flatnonzero(mask)
+
+    filtered_df = df_projects_extended.iloc[positions]
+    if sort_by == 'least_complete':
+        order = np.argsort(filtered_df['PercentComplete'].to_numpy(dtype=float), kind='stable')
+    elif sort_by == 'most_complete':
+        order = np.argsort(-filtered_df['PercentComplete'].to_numpy(dtype=float), kind='stable')
+    elif sort_by == 'most_at_risk':
+        # Dự án có rủi ro trước, sau đó tổng điểm rủi ro mở giảm dần, rồi tiến độ tăng dần
+        order = np.lexsort((
+            filtered_df['PercentComplete'].to_numpy(dtype=float),
+            -filtered_df['OpenRiskScore'].to_numpy(dtype=float),
+            ~filtered_df['IsAtRisk'].to_numpy(dtype=bool),
+        ))
+    elif sort_by == 'name':
+        order = np.argsort(filtered_df['ProjectName'].astype(str).str.lower().to_numpy(), kind='stable')
+    else:
+        return positions
+    return positions[order]
+
+
+def update_project_progress_bars(risk_filter, search_value, sort_by, active_page, projects_extended_data):
+    if projects_extended_data is None:
+        return html.Div(), 1, 1, ''
+    df_projects_extended = get_frame(projects_extended_data, 'projects_extended')
+    if df_projects_extended is None:
+        return html.Div(), 1, 1, ''
+
+    def compute_positions():
+        search_positions = None
+        if search_value:
+            search_positions = get_project_search_index(projects_extended_data).search(search_value)
+        return filter_project_positions(df_projects_extended, risk_filter, search_positions, sort_by)
+
+    key = (projects_extended_data, risk_filter, normalize_search_text(search_value or ''), sort_by)
+    positions = progress_filter_cache.get_or_compute(key, compute_positions)
+
+    if not len(positions):
+        return html.P("Không có dự án nào phù hợp với tiêu chí đã chọn."), 1, 1, ''
+
+    # Đổi bộ lọc thì quay về trang đầu
+    page_count = (len(positions) + PROGRESS_PAGE_SIZE - 1) // PROGRESS_PAGE_SIZE
+    if triggered_id() in ('risk-filter', 'project-search', 'progress-sort', 'projects-extended-data') or not active_page:
+        active_page = 1
+    active_page = min(max(int(active_page), 1), page_count)
+    start = (active_page - 1) * PROGRESS_PAGE_SIZE
+    page_df = df_projects_extended.iloc[positions[start:start + PROGRESS_PAGE_SIZE]]
 
     project_progress_bars = []
-    for _, project in filtered_df.iterrows():
+    for project in page_df.itertuples(index=False):
         progress_bar = dbc.Progress(
-            value=project['PercentComplete'],
-            label=f"{project['StatusIndicator']} {project['ProjectName']} - {project['PercentComplete']:.1f}%",
-            color='danger' if project['IsAtRisk'] else 'success',
+            value=project.PercentComplete,
+            label=f"{project.StatusIndicator} {project.ProjectName} - {project.PercentComplete:.1f}%",
+            color='danger' if project.IsAtRisk else 'success',
             striped=True,
             animated=True,
             className='mb-2',
         )
         project_progress_bars.append(progress_bar)
 
-    if not project_progress_bars:
-        return html.P("Không có dự án nào phù hợp với tiêu chí đã chọn.")
+    summary = f"Hiển thị {start + 1}–{start + len(page_df)} / {len(positions)} dự án"
+    return project_progress_bars, page_count, active_page, summary
+
+
+# Bản chiếu gọn (dạng cột) gửi xuống trình duyệt một lần cho mỗi dataset: chỉ các
+# cột cần để lọc, sắp xếp và vẽ thanh tiến độ
+def update_progress_projection(projects_extended_data):
+    if projects_extended_data is None:
+        return None
+    df_projects_extended = get_frame(projects_extended_data, 'projects_extended')
+    if df_projects_extended is None:
+        return None
+    names = df_projects_extended['ProjectName'].astype(str)
+    return {
+        'page_size': PROGRESS_PAGE_SIZE,
+        'name': names.tolist(),
+        'search': [normalize_search_text(name) for name in names],
+        'percent': df_projects_extended['PercentComplete'].astype(float).tolist(),
+        # Định dạng sẵn để nhãn làm tròn giống hệt server (toFixed làm tròn khác Python)
+        'percent_text': [f"{value:.1f}" for value in df_projects_extended['PercentComplete']],
+        'at_risk': df_projects_extended['IsAtRisk'].astype(bool).tolist(),
+        'status': df_projects_extended['StatusIndicator'].astype(str).tolist(),
+        'open_risk': df_projects_extended['OpenRiskScore'].astype(float).tolist(),
+    }
+
 
-    return project_progress_bars
+PROGRESS_OUTPUTS = [
+    Output('project-progress-bars', 'children'),
+    Output('progress-pagination', 'max_value'),
+    Output('progress-pagination', 'active_page'),
+    Output('progress-summary', 'children'),
+]
+PROGRESS_FILTER_INPUTS = [
+    Input('risk-filter', 'value'),
+    Input('project-search', 'value'),
+    Input('progress-sort', 'value'),
+    Input('progress-pagination', 'active_page'),
+]
+
+if CLIENTSIDE_FILTERING:
+    instrumented_callback(Output('progress-projection', 'data'),
+                          Input('projects-extended-data', 'data'))(update_progress_projection)
+    app.clientside_callback(
+        dash.ClientsideFunction(namespace='dashboard', function_name='renderProgressBars'),
+        PROGRESS_OUTPUTS,
+        PROGRESS_FILTER_INPUTS + [Input('progress-projection', 'data')],
+    )
+else:
+    instrumented_callback(PROGRESS_OUTPUTS,
+                          PROGRESS_FILTER_INPUTS + [Input('projects-extended-data', 'data')])(update_project_progress_bars)
+
+# Khởi động luồng theo dõi sau khi mọi giai đoạn xử lý đã được khai báo; mỗi worker
+# gunicorn có luồng riêng nhưng dùng chung dataset trên đĩa
+data_source = None
+if DATA_DIR:
+    data_source = DataDirectorySource(DATA_DIR, DATA_DIR_POLL_SECONDS)
+    data_source.start()
 
 if __name__ == '__main__':
     app.run_server(debug=True)
@@ -0,0 +1,79 @@
+// Lọc, sắp xếp và vẽ danh sách tiến độ dự án ngay trên trình duyệt
+// (bật bằng DASHBOARD_CLIENTSIDE_FILTERING=1, xem update_progress_projection trong app.py).
+// Kết quả phải giống update_project_progress_bars phía máy chủ.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    dashboard: {
+        // Giống normalize_search_text: bỏ dấu (kể cả đ/Đ), không phân biệt hoa thường
+        normalizeSearchText: function(text) {
+            return String(text)
+                .replace(/đ/g, 'd').replace(/Đ/g, 'D')
+                .normalize('NFD').replace(/\p{M}/gu, '')
+                .toLowerCase()
+                .split(/\s+/).filter(Boolean).join(' ');
+        },
+
+        renderProgressBars: function(riskFilter, searchValue, sortBy, activePage, projection) {
+            if (!projection) {
+                return [{type: 'Div', namespace: 'dash_html_components', props: {}}, 1, 1, ''];
+            }
+            var query = searchValue ? window.dash_clientside.dashboard.normalizeSearchText(searchValue) : '';
+            var positions = [];
+            for (var i = 0; i < projection.name.length; i++) {
+                if (riskFilter === 'at_risk' && !projection.at_risk[i]) continue;
+                if (riskFilter === 'not_at_risk' && projection.at_risk[i]) continue;
+                if (query && projection.search[i].indexOf(query) === -1) continue;
+                positions.push(i);
+            }
+            if (!positions.length) {
+                return [{
+                    type: 'P', namespace: 'dash_html_components',
+                    props: {children: 'Không có dự án nào phù hợp với tiêu chí đã chọn.'}
+                }, 1, 1, ''];
+            }
+
+            // Array.prototype.sort ổn định, khớp với kind='stable' phía máy chủ
+            var percent = projection.percent;
+            if (sortBy === 'least_complete') {
+                positions.sort(function(a, b) { return percent[a] - percent[b]; });
+            } else if (sortBy === 'most_complete') {
+                positions.sort(function(a, b) { return percent[b] - percent[a]; });
+            } else if (sortBy === 'most_at_risk') {
+                positions.sort(function(a, b) {
+                    return (projection.at_risk[b] - projection.at_risk[a])
+                        || (projection.open_risk[b] - projection.open_risk[a])
+                        || (percent[a] - percent[b]);
+                });
+            } else if (sortBy === 'name') {
+                var names = projection.name.map(function(name) { return name.toLowerCase(); });
+                positions.sort(function(a, b) { return names[a] < names[b] ? -1 : names[a] > names[b] ? 1 : 0; });
+            }
+
+            // Đổi bộ lọc thì quay về trang đầu
+            var pageSize = projection.page_size;
+            var pageCount = Math.ceil(positions.length / pageSize);
+            var triggered = window.dash_clientside.callback_context.triggered.map(function(t) { return t.prop_id; });
+            if (!activePage || triggered.some(function(p) { return p.indexOf('progress-pagination.') !== 0; })) {
+                activePage = 1;
+            }
+            activePage = Math.min(Math.max(activePage, 1), pageCount);
+            var start = (activePage - 1) * pageSize;
+            var page = positions.slice(start, start + pageSize);
+
+            var bars = page.map(function(i) {
+                return {
+                    type: 'Progress', namespace: 'dash_bootstrap_components',
+                    props: {
+                        value: percent[i],
+                        label: projection.status[i] + ' ' + projection.name[i] + ' - ' + projection.percent_text[i] + '%',
+                        color: projection.at_risk[i] ? 'danger' : 'success',
+                        striped: true,
+                        animated: true,
+                        className: 'mb-2'
+                    }
+                };
+            });
+            var summary = 'Hiển thị ' + (start + 1) + '–' + (start + page.length) + ' / ' + positions.length + ' dự án';
+            return [bars, pageCount, activePage, summary];
+        }
+    }
+});
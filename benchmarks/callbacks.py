@@ -0,0 +1,184 @@
+# benchmarks/callbacks.py
+#
+# Đo thời gian và bộ nhớ đỉnh của các callback trong app.py trên danh mục dự án
+# tổng hợp (xem generate_portfolio.py). Các callback được gọi trực tiếp, không qua
+# trình duyệt. Kết quả được ghi ra JSON để so sánh giữa các phiên bản:
+#
+#   python benchmarks/callbacks.py --projects 5000 --milestones 100000 --output before.json
+#   python benchmarks/callbacks.py --projects 5000 --milestones 100000 --compare before.json
+
+import argparse
+import base64
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Thư mục dataset riêng cho mỗi lần chạy để bộ đệm theo nội dung không làm sai phép đo
+os.environ.setdefault('DASHBOARD_DATASET_DIR', tempfile.mkdtemp(prefix='dashboard-bench-'))
+
+import app  # noqa: E402
+from generate_portfolio import generate_cost_ledger, generate_portfolio  # noqa: E402
+
+# plotly/pandas phát nhiều FutureWarning làm rối bảng kết quả
+warnings.filterwarnings('ignore', category=FutureWarning)
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func(*args)
+    finally:
+        elapsed = time.perf_counter() - start
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, elapsed, peak_bytes
+
+
+class Recorder:
+    def __init__(self, trace_memory):
+        self.trace_memory = trace_memory
+        self.results = {}
+
+    def run(self, name, func, *args):
+        if self.trace_memory:
+            result, elapsed, peak_bytes = measure(func, *args)
+        else:
+            start = time.perf_counter()
+            result = func(*args)
+            elapsed, peak_bytes = time.perf_counter() - start, None
+        entry = self.results.setdefault(name, {'calls': 0, 'total_s': 0.0, 'max_s': 0.0, 'peak_bytes': 0})
+        entry['calls'] += 1
+        entry['total_s'] += elapsed
+        entry['max_s'] = max(entry['max_s'], elapsed)
+        if peak_bytes is not None:
+            entry['peak_bytes'] = max(entry['peak_bytes'], peak_bytes)
+        return result
+
+    def summary(self):
+        return {
+            name: dict(entry, mean_s=entry['total_s'] / entry['calls'])
+            for name, entry in self.results.items()
+        }
+
+
+def to_upload(df, name):
+    # Mô phỏng nội dung dcc.Upload (data URL base64 của tệp CSV)
+    encoded = base64.b64encode(df.to_csv(index=False).encode('utf-8')).decode('ascii')
+    return f'data:text/csv;base64,{encoded}', f'{name}.csv'
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    frames = generate_portfolio(args.projects, args.milestones, args.resources, args.risks, args.seed)
+    uploads = {name: to_upload(df, name) for name, df in frames.items()}
+    recorder = Recorder(trace_memory=not args.no_memory)
+
+    # Gọi trực tiếp các bước của tác vụ nền (run_ingest_job) để đo từng phần
+    raw_ids = recorder.run('parse_uploads', app.parse_uploads, uploads)
+    processed = recorder.run('process_data', app.process_data, *raw_ids.values())
+    # Tải lên lại cùng các tệp: đọc từ bộ đệm theo nội dung
+    recorder.run('parse_uploads[cached]', app.parse_uploads, uploads)
+    recorder.run('process_data[cached]', app.process_data, *raw_ids.values())
+    # Chỉ tệp rủi ro thay đổi: chỉ các giai đoạn phía sau rủi ro chạy lại
+    changed_risks = frames['risks'].assign(RiskStatus=frames['risks']['RiskStatus'].sample(frac=1, random_state=args.seed).to_numpy())
+    changed_ids = dict(raw_ids, **app.parse_uploads({'risks': to_upload(changed_risks, 'risks')}))
+    recorder.run('process_data[risks changed]', app.process_data, *changed_ids.values())
+    projects_id, milestones_id, resources_id, risks_id = processed[:4]
+
+    # Sổ chi phí: tổng hợp lần đầu rồi bổ sung 10% dòng mới nhất
+    ledger = generate_cost_ledger(frames['projects'], args.cost_rows, args.seed)
+    split = int(len(ledger) * 0.9)
+    contents, filename = to_upload(ledger.iloc[:split], 'costs')
+    cost_ledger_id, _ = recorder.run('load_cost_ledger', app.load_cost_ledger, contents, None, filename, [], None)
+    contents, filename = to_upload(ledger.iloc[split:], 'costs-new')
+    cost_ledger_id, _ = recorder.run('load_cost_ledger[append]', app.load_cost_ledger, contents, None, filename, ['append'], cost_ledger_id)
+
+    recorder.run('update_project_selector', app.update_project_selector, projects_id, None, None)
+    recorder.run('update_project_selector[search]', app.update_project_selector, projects_id, 'he thong', None)
+    recorder.run('update_status_distribution_chart', app.update_status_distribution_chart, projects_id)
+    recorder.run('update_budget_variance_chart', app.update_budget_variance_chart, projects_id)
+    recorder.run('update_budget_variance_chart[histogram]', app.update_budget_variance_chart, projects_id, 'histogram')
+    recorder.run('update_portfolio_risk_heatmap', app.update_portfolio_risk_heatmap, 'all', None, 'all', projects_id, risks_id)
+    recorder.run('update_portfolio_risk_heatmap[open]', app.update_portfolio_risk_heatmap, 'at_risk', None, 'open', projects_id, risks_id)
+    recorder.run('update_risk_heatmap_projects', app.update_risk_heatmap_projects, {'points': [{'x': 'Cao', 'y': 'Cao'}]},
+                 'all', None, 'all', projects_id, risks_id)
+    for risk_filter in ['all', 'at_risk', 'not_at_risk']:
+        recorder.run('update_project_progress_bars', app.update_project_progress_bars, risk_filter, None, 'default', 1, projects_id)
+    recorder.run('update_project_progress_bars[search]', app.update_project_progress_bars, 'all', 'hệ thống', 'default', 1, projects_id)
+    recorder.run('update_progress_projection', app.update_progress_projection, projects_id)
+
+    sample = frames['projects']['ProjectID'].sample(min(args.sample, args.projects), random_state=args.seed).tolist()
+    for project_id in sample:
+        recorder.run('update_project_view', app.update_project_view, project_id, projects_id, milestones_id, resources_id, risks_id,
+                     cost_ledger_id)
+        recorder.run('update_risk_table', app.update_risk_table, project_id, risks_id, 0, app.RISK_TABLE_PAGE_SIZE,
+                     [{'column_id': 'RiskScore', 'direction': 'desc'}], '', [])
+
+    return {
+        'revision': git_revision(),
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sizes': {name: len(df) for name, df in frames.items()},
+        'sample_projects': len(sample),
+        'results': recorder.summary(),
+    }
+
+
+def print_report(report, baseline=None):
+    print(f"revision {report['revision']}  sizes {report['sizes']}")
+    header = f"{'callback':<40}{'calls':>6}{'mean ms':>10}{'max ms':>10}{'peak MB':>9}"
+    if baseline:
+        header += f"{'vs base':>9}"
+    print(header)
+    for name, r in report['results'].items():
+        line = f"{name:<40}{r['calls']:>6}{r['mean_s'] * 1000:>10.1f}{r['max_s'] * 1000:>10.1f}{r['peak_bytes'] / 1e6:>9.1f}"
+        base = (baseline or {}).get('results', {}).get(name)
+        if base and base['mean_s'] > 0:
+            line += f"{r['mean_s'] / base['mean_s']:>8.2f}x"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Đo hiệu năng các callback của app.py')
+    parser.add_argument('--projects', type=int, default=1000)
+    parser.add_argument('--milestones', type=int, default=10000)
+    parser.add_argument('--resources', type=int, default=5000)
+    parser.add_argument('--risks', type=int, default=3000)
+    parser.add_argument('--cost-rows', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sample', type=int, default=20, help='số dự án dùng cho các callback theo dự án')
+    parser.add_argument('--no-memory', action='store_true', help='không đo bộ nhớ (tracemalloc làm chậm phép đo)')
+    parser.add_argument('--output', help='ghi kết quả ra tệp JSON')
+    parser.add_argument('--compare', help='tệp JSON kết quả của phiên bản trước để so sánh')
+    args = parser.parse_args()
+
+    report = run(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+# benchmarks/generate_portfolio.py
+#
+# Sinh dữ liệu danh mục dự án tổng hợp với đúng các cột mà app.py sử dụng
+# (projects / milestones / resources / risks), kích thước tùy chọn từ vài nghìn
+# đến hàng triệu dòng.
+#
+#   python benchmarks/generate_portfolio.py --projects 5000 --milestones 100000 \
+#       --resources 50000 --risks 20000 --format csv --output /tmp/portfolio
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+PROJECT_STATUSES = ['In Progress', 'Completed', 'Not Started']
+PRIORITIES = ['High', 'Critical', 'Medium', 'Low']
+PHASES = ['Execution', 'Planning', 'Closure', 'Initiation']
+MILESTONE_STATUSES = ['Completed', 'In Progress', 'Not Started', 'Delayed']
+MILESTONE_TYPES = ['Deliverable', 'Checkpoint']
+LEVELS = ['Low', 'Medium', 'High']
+RISK_CATEGORIES = ['Operational', 'Technical', 'User', 'Financial', 'Legal']
+RISK_STATUSES = ['Open', 'Closed', 'Mitigated']
+ROLES = ['Project Manager', 'Developer', 'Mobile Developer', 'QA Engineer',
+         'Backend Developer', 'UI/UX Designer', 'Data Scientist', 'Trainer']
+PEOPLE = ['Nguyễn Thành Công', 'Phạm Thị Hương Lan', 'Nguyễn Thanh Hà', 'Nguyễn Đắc Văn',
+          'Nguyễn Huy Thắng', 'Nguyễn Ngọc Tú', 'Đặng Văn Triệu', 'Trần Trung Hiếu',
+          'Nguyễn Văn An', 'Vũ Thị Ngọc Mai']
+NAME_PREFIXES = ['Phát triển ứng dụng', 'Triển khai hệ thống', 'Nâng cấp', 'Xây dựng',
+                 'Nghiên cứu', 'Tích hợp', 'Chuyển đổi số', 'Bảo trì']
+NAME_SUBJECTS = ['Mobile', 'ERP', 'website công ty', 'CRM', 'AI Chatbot', 'phần mềm kế toán',
+                 'Blockchain', 'kho dữ liệu', 'cổng thanh toán', 'hệ thống nhân sự']
+ISSUES = ['Chậm tiến độ do thiếu nhân sự', 'Cần thêm dữ liệu mẫu', 'Thiếu tài liệu nghiên cứu']
+BASE_DATE = np.datetime64('2022-01-01')
+
+
+def _choice(rng, values, size):
+    return np.asarray(values, dtype=object)[rng.integers(0, len(values), size)]
+
+
+def _dates(offsets_days):
+    return pd.Series(BASE_DATE + offsets_days.astype('timedelta64[D]'))
+
+
+def generate_portfolio(n_projects=1000, n_milestones=10000, n_resources=5000, n_risks=3000, seed=0):
+    rng = np.random.default_rng(seed)
+
+    # Dự án
+    project_ids = np.arange(1, n_projects + 1) + 100
+    start = rng.integers(0, 900, n_projects)
+    planned = start + rng.integers(30, 720, n_projects)
+    expected = planned + rng.integers(-30, 120, n_projects)
+    budget = rng.integers(1, 100, n_projects) * 10_000_000
+    actual_cost = (budget * rng.uniform(0, 1.3, n_projects)).astype(np.int64)
+    prefixes = _choice(rng, NAME_PREFIXES, n_projects)
+    subjects = _choice(rng, NAME_SUBJECTS, n_projects)
+    projects = pd.DataFrame({
+        'ProjectID': project_ids,
+        'ProjectName': [f'{p} {s} {i}' for p, s, i in zip(prefixes, subjects, project_ids)],
+        'StartDate': _dates(start),
+        'EndDate': _dates(planned),
+        'ExpectedEndDate': _dates(expected),
+        'ProjectManager': _choice(rng, PEOPLE, n_projects),
+        'ProjectStatus': _choice(rng, PROJECT_STATUSES, n_projects),
+        'Budget': budget,
+        'ActualCost': actual_cost,
+        'BudgetVariance': budget - actual_cost,
+        'Priority': _choice(rng, PRIORITIES, n_projects),
+        'Client': _choice(rng, ['Công ty ABC', 'Công ty XYZ', 'Nội bộ', 'Công ty MNO'], n_projects),
+        'Description': [f'Mô tả dự án {i}' for i in project_ids],
+        'ProjectPhase': _choice(rng, PHASES, n_projects),
+        'ROI': rng.uniform(0.05, 0.3, n_projects).round(2),
+        'KeyDeliverables': 'Tài liệu, Phần mềm',
+        'Stakeholders': 'Ban lãnh đạo, Khách hàng',
+    })
+
+    # Mốc
+    owner = rng.integers(0, n_projects, n_milestones)
+    m_start = start[owner] + rng.integers(0, 300, n_milestones)
+    m_end = m_start + rng.integers(7, 120, n_milestones)
+    percent = rng.choice([0, 25, 50, 60, 75, 100], n_milestones)
+    completed = percent == 100
+    actual_completion = _dates(m_end + rng.integers(-10, 30, n_milestones))
+    actual_completion[~completed] = pd.NaT
+    issues = _choice(rng, ISSUES, n_milestones)
+    issues[rng.random(n_milestones) > 0.1] = None
+    milestones = pd.DataFrame({
+        'ProjectID': project_ids[owner],
+        'MilestoneID': np.arange(1, n_milestones + 1),
+        'MilestoneName': [f'Mốc {i}' for i in range(1, n_milestones + 1)],
+        'MilestoneStartDate': _dates(m_start),
+        'MilestoneEndDate': _dates(m_end),
+        'ActualCompletionDate': actual_completion,
+        'Status': np.where(completed, 'Completed', _choice(rng, MILESTONE_STATUSES[1:], n_milestones)),
+        'Description': 'Mô tả mốc',
+        'MilestoneOwner': _choice(rng, PEOPLE, n_milestones),
+        'Dependencies': np.nan,
+        'PercentComplete': percent,
+        'MilestoneType': _choice(rng, MILESTONE_TYPES, n_milestones),
+        'Issues': issues,
+        'RisksAssociated': None,
+    })
+
+    # Tài nguyên
+    owner = rng.integers(0, n_projects, n_resources)
+    allocated = rng.choice([80, 160, 200, 240, 320], n_resources)
+    resources = pd.DataFrame({
+        'ResourceID': np.arange(1, n_resources + 1),
+        'ResourceName': _choice(rng, PEOPLE, n_resources),
+        'Role': _choice(rng, ROLES, n_resources),
+        'ProjectID': project_ids[owner],
+        'AllocatedHours': allocated,
+        'TotalCapacity': 320,
+        'Utilization': allocated / 320,
+        'Skills': 'Python, Agile',
+        'Availability': 'Available',
+        'ActualHoursWorked': allocated,
+        'CostPerHour': rng.integers(300, 700, n_resources) * 1000,
+        'ResourceType': 'Human',
+        'OvertimeHours': rng.choice([0, 10, 20], n_resources),
+        'ContactInformation': 'contact@example.com',
+        'PerformanceRating': rng.uniform(4.0, 5.0, n_resources).round(1),
+    })
+
+    # Rủi ro
+    owner = rng.integers(0, n_projects, n_risks)
+    identified = start[owner] + rng.integers(0, 300, n_risks)
+    impact = _choice(rng, LEVELS, n_risks)
+    probability = _choice(rng, LEVELS, n_risks)
+    level = {'Low': 1, 'Medium': 2, 'High': 3}
+    risks = pd.DataFrame({
+        'RiskID': [f'R{i}' for i in range(1, n_risks + 1)],
+        'ProjectID': project_ids[owner],
+        'RiskDescription': 'Mô tả rủi ro',
+        'ImpactLevel': impact,
+        'Probability': probability,
+        'RiskScore': [level[i] * level[p] for i, p in zip(impact, probability)],
+        'MitigationPlan': 'Kế hoạch giảm thiểu',
+        'Owner': _choice(rng, PEOPLE, n_risks),
+        'RiskCategory': _choice(rng, RISK_CATEGORIES, n_risks),
+        'RiskStatus': _choice(rng, RISK_STATUSES, n_risks),
+        'DateIdentified': _dates(identified),
+        'RiskOwner': _choice(rng, PEOPLE, n_risks),
+        'RiskTrigger': 'Dấu hiệu rủi ro',
+        'ContingencyPlan': 'Kế hoạch dự phòng',
+        'ResidualRisk': 'Rủi ro còn lại',
+        'RiskReviewDate': _dates(identified + rng.integers(7, 60, n_risks)),
+    })
+
+    return {'projects': projects, 'milestones': milestones, 'resources': resources, 'risks': risks}
+
+
+# Sổ chi phí (Date, ProjectID, Amount): các khoản chi rải đều trong thời gian dự án,
+# tổng xấp xỉ ActualCost của dự án
+def generate_cost_ledger(projects, n_rows=50000, seed=0):
+    rng = np.random.default_rng(seed)
+    owner = rng.integers(0, len(projects), n_rows)
+    start = projects['StartDate'].to_numpy()[owner]
+    span = (projects['ExpectedEndDate'] - projects['StartDate']).dt.days.clip(lower=1).to_numpy()[owner]
+    counts = np.bincount(owner, minlength=len(projects))[owner]
+    return pd.DataFrame({
+        'Date': start + (rng.random(n_rows) * span).astype('timedelta64[D]'),
+        'ProjectID': projects['ProjectID'].to_numpy()[owner],
+        'Amount': (projects['ActualCost'].to_numpy()[owner] / counts * rng.uniform(0.5, 1.5, n_rows)).round(),
+    }).sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+def write_portfolio(frames, output_dir, file_format='csv'):
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {}
+    for name, df in frames.items():
+        path = os.path.join(output_dir, f'{name}.{file_format}')
+        if file_format == 'xlsx':
+            df.to_excel(path, index=False)
+        else:
+            df.to_csv(path, index=False)
+        paths[name] = path
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sinh dữ liệu danh mục dự án tổng hợp')
+    parser.add_argument('--projects', type=int, default=1000)
+    parser.add_argument('--milestones', type=int, default=10000)
+    parser.add_argument('--resources', type=int, default=5000)
+    parser.add_argument('--risks', type=int, default=3000)
+    parser.add_argument('--cost-rows', type=int, default=0, help='số dòng sổ chi phí (0: không sinh)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--format', choices=['csv', 'xlsx'], default='csv')
+    parser.add_argument('--output', required=True, help='thư mục ghi các tệp')
+    args = parser.parse_args()
+
+    frames = generate_portfolio(args.projects, args.milestones, args.resources, args.risks, args.seed)
+    if args.cost_rows:
+        frames['costs'] = generate_cost_ledger(frames['projects'], args.cost_rows, args.seed)
+    for name, path in write_portfolio(frames, args.output, args.format).items():
+        print(f'{name}: {len(frames[name])} dòng -> {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/interchange.py
+#
+# So sánh định dạng trao đổi dữ liệu cũ (JSON orient='split') với Arrow IPC
+# trên dữ liệu demo được nhân lên SCALE lần: kích thước, thời gian mã hóa và
+# thời gian giải mã thành DataFrame có kiểu (bao gồm cả việc phân tích lại ngày).
+#
+#   python benchmarks/interchange.py [--scale 1000] [--output results.json]
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data-demo')
+DATE_COLUMNS = {
+    'projects': ['StartDate', 'EndDate', 'ExpectedEndDate'],
+    'milestones': ['MilestoneStartDate', 'MilestoneEndDate', 'ActualCompletionDate'],
+    'resources': [],
+    'risks': ['DateIdentified', 'RiskReviewDate'],
+}
+
+
+def load_scaled(name, scale):
+    df = pd.read_excel(os.path.join(DATA_DIR, f'{name}.xlsx'))
+    for col in DATE_COLUMNS[name]:
+        df[col] = pd.to_datetime(df[col], errors='coerce')
+    step = int(df['ProjectID'].max()) + 1
+    copies = []
+    for i in range(scale):
+        copy = df.copy()
+        copy['ProjectID'] = copy['ProjectID'] + i * step
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def timed(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def decode_json(payload, name):
+    df = pd.read_json(io.StringIO(payload), orient='split')
+    for col in DATE_COLUMNS[name]:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    return df
+
+
+def run(scale, repeat):
+    results = {}
+    for name in DATE_COLUMNS:
+        df = load_scaled(name, scale)
+        json_payload, json_encode = timed(lambda: df.to_json(date_format='iso', orient='split'), repeat)
+        _, json_decode = timed(lambda: decode_json(json_payload, name), repeat)
+        arrow_payload, arrow_encode = timed(lambda: app.encode_frame(df), repeat)
+        _, arrow_decode = timed(lambda: app.decode_frame(arrow_payload), repeat)
+        results[name] = {
+            'rows': len(df),
+            'json_bytes': len(json_payload.encode('utf-8')),
+            'json_encode_s': json_encode,
+            'json_decode_s': json_decode,
+            'arrow_bytes': len(arrow_payload),
+            'arrow_encode_s': arrow_encode,
+            'arrow_decode_s': arrow_decode,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='So sánh JSON orient=split với Arrow IPC')
+    parser.add_argument('--scale', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='ghi kết quả ra tệp JSON')
+    args = parser.parse_args()
+
+    results = run(args.scale, args.repeat)
+    print(f"{'bảng':<12}{'dòng':>9}{'JSON MB':>10}{'Arrow MB':>10}{'JSON đọc s':>12}{'Arrow đọc s':>13}")
+    for name, r in results.items():
+        print(f"{name:<12}{r['rows']:>9}{r['json_bytes'] / 1e6:>10.2f}{r['arrow_bytes'] / 1e6:>10.2f}"
+              f"{r['json_decode_s']:>12.3f}{r['arrow_decode_s']:>13.4f}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'scale': args.scale, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
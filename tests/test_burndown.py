@@ -0,0 +1,107 @@
+# tests/test_burndown.py
+#
+# So sánh stage_burndown (một lần cho mọi dự án) với vòng lặp đơn giản theo từng
+# ProjectID: pd.date_range(freq='W') từ ngày bắt đầu mốc sớm nhất tới ngày kết thúc
+# mốc muộn nhất, số mốc còn lại theo ActualCompletionDate / MilestoneEndDate.
+#
+#   python -m pytest -q tests
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DASHBOARD_DATASET_DIR', tempfile.mkdtemp(prefix='dashboard-test-'))
+
+import app  # noqa: E402
+
+
+# Vòng lặp tham chiếu: lọc mốc của từng dự án rồi đếm theo từng tuần
+def reference_burndown(df_milestones):
+    rows = []
+    for project_id, milestones in df_milestones.groupby('ProjectID', sort=True):
+        start_date = milestones['MilestoneStartDate'].min()
+        end_date = milestones['MilestoneEndDate'].max()
+        if pd.isnull(start_date) or pd.isnull(end_date):
+            continue
+        total_tasks = len(milestones)
+        for date in pd.date_range(start=start_date, end=end_date, freq='W'):
+            rows.append({
+                'ProjectID': project_id,
+                'Date': date,
+                'Remaining': total_tasks - int((milestones['ActualCompletionDate'] <= date).sum()),
+                'Planned': total_tasks - int((milestones['MilestoneEndDate'] <= date).sum()),
+            })
+    return pd.DataFrame(rows, columns=['ProjectID', 'Date', 'Remaining', 'Planned'])
+
+
+def make_milestones(projects, per_project, seed=0):
+    rng = np.random.default_rng(seed)
+    n = projects * per_project
+    start = pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 400, n), 'D')
+    end = start + pd.to_timedelta(rng.integers(1, 120, n), 'D')
+    actual = end + pd.to_timedelta(rng.integers(-30, 60, n), 'D')
+    df = pd.DataFrame({
+        'ProjectID': rng.permutation(np.repeat(np.arange(101, 101 + projects), per_project)),
+        'MilestoneID': np.arange(n),
+        'MilestoneStartDate': start,
+        'MilestoneEndDate': end,
+        'ActualCompletionDate': pd.Series(actual).where(rng.random(n) > 0.3),
+    })
+    return df
+
+
+def run_stage(df_milestones):
+    df_milestones, milestones_index = app.build_project_index(df_milestones)
+    return app.stage_burndown({'milestones': df_milestones, 'milestones_index': milestones_index})
+
+
+def assert_matches_reference(df_milestones):
+    result = run_stage(df_milestones)
+    expected = reference_burndown(df_milestones)
+    burndown = result['burndown']
+    assert burndown['ProjectID'].tolist() == expected['ProjectID'].tolist()
+    assert list(burndown['Date']) == list(expected['Date'])
+    assert burndown['Remaining'].tolist() == expected['Remaining'].tolist()
+    assert burndown['Planned'].tolist() == expected['Planned'].tolist()
+    # Chỉ mục dự án cắt đúng chuỗi của từng dự án
+    for project_id, (start, stop) in result['burndown_index'].items():
+        assert (burndown['ProjectID'].iloc[start:stop] == project_id).all()
+    return result
+
+
+def test_random_portfolio():
+    assert_matches_reference(make_milestones(40, 12))
+
+
+def test_missing_dates():
+    df = make_milestones(30, 8, seed=1)
+    df.loc[::7, 'MilestoneStartDate'] = pd.NaT
+    df.loc[::11, 'MilestoneEndDate'] = pd.NaT
+    # Dự án không có ngày bắt đầu nào thì không có burn-down
+    df.loc[df['ProjectID'] == 101, 'MilestoneStartDate'] = pd.NaT
+    result = assert_matches_reference(df)
+    assert 101 not in result['burndown_index']
+
+
+def test_completion_outside_project_range():
+    df = make_milestones(10, 6, seed=2)
+    df.loc[::5, 'ActualCompletionDate'] = pd.Timestamp('2019-01-01')
+    df.loc[1::5, 'ActualCompletionDate'] = pd.Timestamp('2030-01-01')
+    assert_matches_reference(df)
+
+
+@pytest.mark.parametrize('df', [
+    make_milestones(5, 4).iloc[:0],
+    make_milestones(5, 4).assign(MilestoneStartDate=pd.NaT),
+])
+def test_empty(df):
+    result = run_stage(df)
+    assert result['burndown'].empty
+    assert result['burndown_index'] == {}
+    assert list(result['burndown'].columns) == ['ProjectID', 'Date', 'Remaining', 'Planned']
@@ -0,0 +1,76 @@
+# tests/test_completion.py
+#
+# So sánh calculate_project_completion (một lần groupby) với vòng lặp theo từng
+# ProjectID của phiên bản trước trên các tệp data-demo và các trường hợp biên.
+#
+#   python -m pytest -q tests
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DASHBOARD_DATASET_DIR', tempfile.mkdtemp(prefix='dashboard-test-'))
+
+import app  # noqa: E402
+
+DEMO_DIR = os.path.join(ROOT, 'data-demo')
+
+
+# Vòng lặp gốc: lọc df_milestones cho từng dự án rồi merge lại
+def reference_project_completion(df_projects, df_milestones):
+    project_completion = []
+    for project_id in df_projects['ProjectID']:
+        milestones = df_milestones[df_milestones['ProjectID'] == project_id]
+        if not milestones.empty and 'PercentComplete' in milestones.columns:
+            percent_complete = milestones['PercentComplete'].mean()
+        else:
+            percent_complete = 0
+        project_completion.append({'ProjectID': project_id, 'PercentComplete': percent_complete})
+    df_completion = pd.DataFrame(project_completion)
+    return pd.merge(df_projects, df_completion, on='ProjectID')
+
+
+@pytest.fixture(scope='module')
+def demo():
+    return (pd.read_excel(os.path.join(DEMO_DIR, 'projects.xlsx')),
+            pd.read_excel(os.path.join(DEMO_DIR, 'milestones.xlsx')))
+
+
+def assert_matches_reference(df_projects, df_milestones):
+    result = app.calculate_project_completion(df_projects, df_milestones)
+    expected = reference_project_completion(df_projects, df_milestones)
+    pdt.assert_frame_equal(result.reset_index(drop=True), expected)
+    return result
+
+
+def test_demo_workbooks(demo):
+    assert_matches_reference(*demo)
+
+
+def test_project_without_milestones(demo):
+    df_projects, df_milestones = demo
+    first_project = df_projects['ProjectID'].iloc[0]
+    result = assert_matches_reference(df_projects, df_milestones[df_milestones['ProjectID'] != first_project])
+    assert result['PercentComplete'].iloc[0] == 0
+
+
+def test_all_nan_percent_complete(demo):
+    df_projects, df_milestones = demo
+    first_project = df_projects['ProjectID'].iloc[0]
+    df_milestones = df_milestones.copy()
+    df_milestones.loc[df_milestones['ProjectID'] == first_project, 'PercentComplete'] = np.nan
+    result = assert_matches_reference(df_projects, df_milestones)
+    assert np.isnan(result['PercentComplete'].iloc[0])
+
+
+def test_missing_percent_complete_column(demo):
+    df_projects, df_milestones = demo
+    result = assert_matches_reference(df_projects, df_milestones.drop(columns=['PercentComplete']))
+    assert (result['PercentComplete'] == 0).all()
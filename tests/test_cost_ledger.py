@@ -0,0 +1,73 @@
+# tests/test_cost_ledger.py
+#
+# Bổ sung dòng vào sổ chi phí (append_cost_rollup) phải cho cùng kết quả với việc
+# tổng hợp lại toàn bộ sổ (build_cost_rollup), kể cả khi dòng mới rơi vào các kỳ
+# sớm hơn kỳ cuối cùng đã có.
+#
+#   python -m pytest -q tests
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DASHBOARD_DATASET_DIR', tempfile.mkdtemp(prefix='dashboard-test-'))
+
+import app  # noqa: E402
+
+
+def make_ledger(rows, projects=(101, 121), days=(0, 720), seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Date': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(*days, rows), 'D'),
+        'ProjectID': rng.integers(*projects, rows),
+        'Amount': rng.integers(0, 100000, rows).astype(float),
+    })
+
+
+def assert_append_matches_rebuild(base, extra):
+    appended = app.append_cost_rollup(app.build_cost_rollup(app.clean_cost_ledger(base)),
+                                      app.clean_cost_ledger(extra))
+    rebuilt = app.build_cost_rollup(app.clean_cost_ledger(pd.concat([base, extra], ignore_index=True)))
+    for name in app.COST_ROLLUPS:
+        pdt.assert_frame_equal(appended[name][['ProjectID', 'Period', 'Amount', 'Cumulative']],
+                               rebuilt[name][['ProjectID', 'Period', 'Amount', 'Cumulative']],
+                               check_dtype=False)
+        assert appended[name + '_index'] == rebuilt[name + '_index']
+
+
+def test_random_split():
+    ledger = make_ledger(5000)
+    assert_append_matches_rebuild(ledger.iloc[:4000], ledger.iloc[4000:])
+
+
+def test_append_after_existing_periods():
+    base = make_ledger(2000, days=(0, 360), seed=1)
+    extra = make_ledger(500, days=(360, 720), seed=2)
+    assert_append_matches_rebuild(base, extra)
+
+
+def test_append_into_earlier_periods():
+    # Dòng mới nằm trước kỳ cuối (và cả trước kỳ đầu) của dự án đã có
+    base = make_ledger(2000, days=(180, 720), seed=3)
+    extra = make_ledger(300, days=(0, 360), seed=4)
+    assert_append_matches_rebuild(base, extra)
+
+
+@pytest.mark.parametrize('projects', [(101, 106), (121, 131)])
+def test_append_subset_and_new_projects(projects):
+    base = make_ledger(2000, seed=5)
+    extra = make_ledger(200, projects=projects, seed=6)
+    assert_append_matches_rebuild(base, extra)
+
+
+def test_append_invalid_rows_only():
+    base = make_ledger(1000, seed=7)
+    extra = pd.DataFrame({'Date': ['không rõ'], 'ProjectID': [101], 'Amount': [1.0]})
+    assert_append_matches_rebuild(base, extra)
@@ -0,0 +1,60 @@
+# tests/test_risk_filter.py
+#
+# Phân tích filter_query của bảng rủi ro (split_filter_part / risk_filter_mask),
+# đặc biệt giá trị văn bản chứa các từ trùng tên toán tử (ge, le, lt, gt, ne, eq).
+#
+#   python -m pytest -q tests
+
+import os
+import sys
+import tempfile
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DASHBOARD_DATASET_DIR', tempfile.mkdtemp(prefix='dashboard-test-'))
+
+import app  # noqa: E402
+
+
+@pytest.fixture
+def risks():
+    return pd.DataFrame({
+        'RiskID': ['R1', 'R2', 'R3', 'R4'],
+        'RiskDescription': ['Thiếu large area lưu trữ', 'Change request muộn', 'Manage scope kém', 'Thiếu nhân sự'],
+        'RiskScore': [9, 6, 4, 1],
+        'RiskOwner': ["O'Neil", 'An', 'Mai', 'An'],
+    })
+
+
+@pytest.mark.parametrize('filter_part, expected', [
+    ('{RiskDescription} contains "large area"', ('RiskDescription', 'contains', 'large area')),
+    ('{RiskDescription} contains change request', ('RiskDescription', 'contains', 'change request')),
+    ('{RiskDescription} contains manage scope', ('RiskDescription', 'contains', 'manage scope')),
+    ('{RiskDescription} contains "ne eq lt "', ('RiskDescription', 'contains', 'ne eq lt ')),
+    ('{RiskScore} ge 6', ('RiskScore', 'ge', 6.0)),
+    ('{RiskScore} >= 6', ('RiskScore', 'ge', 6.0)),
+    ('{RiskScore} lt 4', ('RiskScore', 'lt', 4.0)),
+    ('{RiskID} eq "R1"', ('RiskID', 'eq', 'R1')),
+    ("{RiskOwner} eq 'O\\'Neil'", ('RiskOwner', 'eq', "O'Neil")),
+    ('{DateIdentified} datestartswith 2023-01', ('DateIdentified', 'datestartswith', '2023-01')),
+    ('{RiskDescription} containsfoo', (None, None, None)),
+    ('RiskScore ge 6', (None, None, None)),
+])
+def test_split_filter_part(filter_part, expected):
+    assert app.split_filter_part(filter_part) == expected
+
+
+@pytest.mark.parametrize('filter_query, expected_ids', [
+    ('{RiskDescription} contains "large area"', ['R1']),
+    ('{RiskDescription} contains change request', ['R2']),
+    ('{RiskDescription} contains manage scope', ['R3']),
+    ('{RiskDescription} contains thiếu && {RiskScore} ge 6', ['R1']),
+    ('{RiskScore} >= 4 && {RiskOwner} ne An', ['R1', 'R3']),
+    ('', ['R1', 'R2', 'R3', 'R4']),
+])
+def test_risk_filter_mask(risks, filter_query, expected_ids):
+    mask = app.risk_filter_mask(risks, filter_query)
+    assert risks.loc[mask, 'RiskID'].tolist() == expected_ids